@@ -0,0 +1,63 @@
+"""Throughput benchmark for the theme API under concurrent load.
+
+Fires N requests at a running server with C in flight at once and reports
+requests/second plus latency percentiles. Run it against a server started with
+``python index.py`` (or uvicorn) and a populated database:
+
+    python benchmarks/concurrent_requests.py --url http://localhost:8000/themes/ -c 100 -n 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, url: str, remaining: list, latencies: list, errors: list):
+    while remaining:
+        remaining.pop()
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, concurrency: int, total: int):
+    remaining = list(range(total))
+    latencies: list = []
+    errors: list = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, url, remaining, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"url:          {url}")
+    print(f"concurrency:  {concurrency}")
+    print(f"requests:     {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"latency p50:  {pct(0.50):.1f} ms")
+    print(f"latency p99:  {pct(0.99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/themes/")
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
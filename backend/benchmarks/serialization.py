@@ -0,0 +1,105 @@
+"""Per-item cost of serializing theme listings, before and after the fast path.
+
+"validated" is the old path: each document goes through ``ThemeSummary(**doc)``,
+then FastAPI validates the response against ``response_model``, serializes it
+and encodes it with the stdlib ``json``. "trusted" builds models with
+``from_document`` and encodes them with orjson. Runs offline on generated
+documents:
+
+    python benchmarks/serialization.py -n 50 -r 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from models.theme import ThemeListResponse, ThemeResponse, ThemeSummary
+from utils.serialization import dump_json
+
+
+def make_documents(count: int, full: bool) -> list:
+    now = datetime(2025, 6, 1)
+    documents = []
+    for i in range(count):
+        doc = {
+            "_id": str(ObjectId()),
+            "theme_id": i + 1,
+            "name": f"Theme {i}",
+            "author_name": "someone",
+            "short_description": "A short description of the theme",
+            "tags": ["dark", "minimal", "music"],
+            "user_id": str(ObjectId()),
+            "download_count": i * 7,
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now,
+        }
+        if full:
+            doc.update(description="A longer description. " * 20, zip_file_id=str(ObjectId()), bgm_info="bgm")
+        documents.append(doc)
+    return documents
+
+
+def listing(themes: list) -> dict:
+    return {"themes": themes, "total": 1000, "exact": False, "page": 1, "limit": len(themes), "next_cursor": None}
+
+
+def validated_listing(documents: list, adapter: TypeAdapter) -> bytes:
+    content = listing([ThemeSummary(**doc) for doc in documents])
+    value = adapter.validate_python(content, from_attributes=True)
+    return json.dumps(adapter.dump_python(value, mode="json", by_alias=True), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def trusted_listing(documents: list, adapter: TypeAdapter) -> bytes:
+    return dump_json(listing([ThemeSummary.from_document(doc) for doc in documents]))
+
+
+def validated_theme(documents: list, adapter: TypeAdapter) -> bytes:
+    value = adapter.validate_python(ThemeResponse(**documents[0]), from_attributes=True)
+    return json.dumps(adapter.dump_python(value, mode="json", by_alias=True), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def trusted_theme(documents: list, adapter: TypeAdapter) -> bytes:
+    return dump_json(ThemeResponse.from_document(documents[0]))
+
+
+def measure(label: str, encode, documents: list, adapter: TypeAdapter, rounds: int, items: int) -> float:
+    encode(documents, adapter)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        encode(documents, adapter)
+    per_item = (time.perf_counter() - started) / (rounds * items) * 1e6
+    print(f"{label:<22} {per_item:8.2f} us/item")
+    return per_item
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--items", type=int, default=50, help="themes per listing page")
+    parser.add_argument("-r", "--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    summaries = make_documents(args.items, full=False)
+    themes = make_documents(1, full=True)
+    list_adapter, theme_adapter = TypeAdapter(ThemeListResponse), TypeAdapter(ThemeResponse)
+
+    # Both paths must produce the same document
+    assert json.loads(validated_listing(summaries, list_adapter)) == json.loads(trusted_listing(summaries, list_adapter))
+    assert json.loads(validated_theme(themes, theme_adapter)) == json.loads(trusted_theme(themes, theme_adapter))
+
+    before = measure("listing (validated)", validated_listing, summaries, list_adapter, args.rounds, args.items)
+    after = measure("listing (trusted)", trusted_listing, summaries, list_adapter, args.rounds, args.items)
+    print(f"{'speedup':<22} {before / after:8.2f}x")
+    before = measure("theme (validated)", validated_theme, themes, theme_adapter, args.rounds * 20, 1)
+    after = measure("theme (trusted)", trusted_theme, themes, theme_adapter, args.rounds * 20, 1)
+    print(f"{'speedup':<22} {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
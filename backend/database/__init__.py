@@ -3,6 +3,9 @@
 # Connection
 from .connection import connect_to_mongo, close_mongo_connection, get_database, test_connection
 
+# Index management
+from .indexes import ensure_indexes, get_missing_indexes
+
 # Auth operations
 from .auth import (
     get_user_by_email,
@@ -29,22 +32,66 @@ from .contact import (
     update_contact_message_status
 )
 
+# Theme image operations
+from .images import (
+    store_theme_image,
+    get_theme_image,
+    store_preview_variants,
+    delete_theme_images,
+    migrate_embedded_images,
+    backfill_preview_variants
+)
+
+# Buffered download counting
+from .download_buffer import DownloadCounterBuffer, download_counter
+
+# Blob storage backends
+from .storage import BlobStore, GridFSStore, LocalFileStore, LocalFile, get_blob_store, migrate_blobs
+
+# Content-addressed file storage
+from .blobs import store_blob, release_blob, get_dedup_report
+
+# Theme ZIPs stored by member
+from .theme_zip import ThemeZip, store_theme_zip, release_theme_zip
+
+# Hot theme file cache
+from .file_cache import CachedFile, HotFileCache, theme_file_cache
+
+# Search suggestions
+from .suggestions import SuggestionIndex, suggestion_index
+
+# Tag statistics
+from .tags import apply_tag_changes, get_tag_stats, rebuild_tag_stats
+
 # Theme operations
 from .theme import (
     create_theme,
     get_theme_by_id,
     get_themes,
+    search_themes,
     get_themes_by_user,
+    get_themes_batch,
     update_theme,
     delete_theme,
     increment_download_count,
     store_file,
     get_file,
+    open_theme_file,
+    open_theme_zip,
+    get_theme_zip,
+    split_theme_zips,
+    iter_file_chunks,
+    iter_file_range,
+    get_file_digest,
+    get_zip_content_size,
     delete_file,
     get_file_info,
     get_theme,
     get_current_time,
     get_popular_themes,
+    get_trending_themes,
+    invalidate_theme_caches,
+    get_cache_stats,
     get_recent_themes,
     get_all_tags
 )
@@ -55,6 +102,9 @@ __all__ = [
     "close_mongo_connection", 
     "get_database",
     "test_connection",
+    # Index management
+    "ensure_indexes",
+    "get_missing_indexes",
     # Auth operations
     "get_user_by_email",
     "create_user",
@@ -74,21 +124,70 @@ __all__ = [
     "get_contact_messages",
     "get_contact_message_by_id",
     "update_contact_message_status",
+    # Theme image operations
+    "store_theme_image",
+    "get_theme_image",
+    "store_preview_variants",
+    "delete_theme_images",
+    "migrate_embedded_images",
+    "backfill_preview_variants",
+    # Buffered download counting
+    "DownloadCounterBuffer",
+    "download_counter",
+    # Blob storage backends
+    "BlobStore",
+    "GridFSStore",
+    "LocalFileStore",
+    "LocalFile",
+    "get_blob_store",
+    "migrate_blobs",
+    # Content-addressed file storage
+    "store_blob",
+    "release_blob",
+    "get_dedup_report",
+    # Theme ZIPs stored by member
+    "ThemeZip",
+    "store_theme_zip",
+    "release_theme_zip",
+    # Hot theme file cache
+    "CachedFile",
+    "HotFileCache",
+    "theme_file_cache",
+    # Search suggestions
+    "SuggestionIndex",
+    "suggestion_index",
+    # Tag statistics
+    "apply_tag_changes",
+    "get_tag_stats",
+    "rebuild_tag_stats",
     # Theme operations
     "create_theme",
     "get_theme_by_id",
     "get_themes",
+    "search_themes",
     "get_themes_by_user",
+    "get_themes_batch",
     "update_theme",
     "delete_theme",
     "increment_download_count",
     "store_file",
     "get_file",
+    "open_theme_file",
+    "open_theme_zip",
+    "get_theme_zip",
+    "split_theme_zips",
+    "iter_file_chunks",
+    "iter_file_range",
+    "get_file_digest",
+    "get_zip_content_size",
     "delete_file",
     "get_file_info",
     "get_theme",
     "get_current_time",
     "get_popular_themes",
+    "get_trending_themes",
+    "invalidate_theme_caches",
+    "get_cache_stats",
     "get_recent_themes",
     "get_all_tags"
 ] 
\ No newline at end of file
@@ -10,7 +10,7 @@ logger = logging.getLogger(__name__)
 
 
 # User collection operations
-def get_user_by_email(email: str):
+async def get_user_by_email(email: str):
     """Get user by email from MongoDB."""
     try:
         db = get_database()
@@ -18,14 +18,14 @@ def get_user_by_email(email: str):
             logger.error("Database connection is None")
             return None
         
-        user = db.users.find_one({"email": email})
+        user = await db.users.find_one({"email": email})
         return user
     except Exception as e:
         logger.error(f"Error in get_user_by_email: {e}")
         raise
 
 
-def create_user(email: str, username: str, hashed_password: str):
+async def create_user(email: str, username: str, hashed_password: str):
     """Create a new user in MongoDB."""
     try:
         db = get_database()
@@ -48,7 +48,7 @@ def create_user(email: str, username: str, hashed_password: str):
             "profile_image": None
         }
         
-        result = db.users.insert_one(user)
+        result = await db.users.insert_one(user)
         if result.inserted_id:
             return user
         else:
@@ -59,7 +59,7 @@ def create_user(email: str, username: str, hashed_password: str):
         raise
 
 
-def update_user(email: str, update_data: dict):
+async def update_user(email: str, update_data: dict):
     """Update user in MongoDB."""
     try:
         db = get_database()
@@ -67,7 +67,7 @@ def update_user(email: str, update_data: dict):
             logger.error("Database connection is None")
             return None
         
-        result = db.users.update_one(
+        result = await db.users.update_one(
             {"email": email},
             {"$set": update_data}
         )
@@ -80,67 +80,67 @@ def update_user(email: str, update_data: dict):
         raise
 
 
-def move_user_to_deactivated(email: str) -> bool:
+async def move_user_to_deactivated(email: str) -> bool:
     """Move a user from users to deactivated_users collection."""
     try:
         db = get_database()
         if db is None:
             logger.error("Database connection is None")
             return False
-        user = db.users.find_one({"email": email})
+        user = await db.users.find_one({"email": email})
         if not user:
             logger.warning(f"No user found to move to deactivated_users with email: {email}")
             return False
         # Remove _id to avoid duplicate key error in deactivated_users
         user.pop("_id", None)
         user["deactivated_at"] = datetime.utcnow()
-        db.deactivated_users.insert_one(user)
-        db.users.delete_one({"email": email})
+        await db.deactivated_users.insert_one(user)
+        await db.users.delete_one({"email": email})
         return True
     except Exception as e:
         logger.error(f"Error moving user to deactivated_users: {e}")
         raise
 
 
-def get_deactivated_user_by_email(email: str):
+async def get_deactivated_user_by_email(email: str):
     """Get deactivated user by email from deactivated_users collection."""
     try:
         db = get_database()
         if db is None:
             logger.error("Database connection is None")
             return None
-        user = db.deactivated_users.find_one({"email": email})
+        user = await db.deactivated_users.find_one({"email": email})
         return user
     except Exception as e:
         logger.error(f"Error in get_deactivated_user_by_email: {e}")
         raise
 
 
-def get_deactivated_user_by_username(username: str):
+async def get_deactivated_user_by_username(username: str):
     """Get deactivated user by username from deactivated_users collection."""
     try:
         db = get_database()
         if db is None:
             logger.error("Database connection is None")
             return None
-        user = db.deactivated_users.find_one({"username": username})
+        user = await db.deactivated_users.find_one({"username": username})
         return user
     except Exception as e:
         logger.error(f"Error in get_deactivated_user_by_username: {e}")
         raise
 
 
-def soft_delete_user(email: str):
+async def soft_delete_user(email: str):
     """Soft delete user: move to deactivated_users and remove from users."""
-    return move_user_to_deactivated(email)
+    return await move_user_to_deactivated(email)
 
 
-def hard_delete_user(email: str):
+async def hard_delete_user(email: str):
     """Hard delete user: move to deactivated_users and remove from users (same as soft for now)."""
-    return move_user_to_deactivated(email)
+    return await move_user_to_deactivated(email)
 
 
-def get_user_by_id(user_id: str):
+async def get_user_by_id(user_id: str):
     """Get user by ID from MongoDB."""
     try:
         db = get_database()
@@ -148,14 +148,14 @@ def get_user_by_id(user_id: str):
             logger.error("Database connection is None")
             return None
         
-        user = db.users.find_one({"_id": user_id})
+        user = await db.users.find_one({"_id": user_id})
         return user
     except Exception as e:
         logger.error(f"Error getting user by ID: {e}")
         raise
 
 
-def update_user_profile(email: str, update_data: dict):
+async def update_user_profile(email: str, update_data: dict):
     """Update user profile in MongoDB."""
     try:
         db = get_database()
@@ -166,7 +166,7 @@ def update_user_profile(email: str, update_data: dict):
         # Filter out None values to avoid overwriting with None
         filtered_data = {k: v for k, v in update_data.items() if v is not None}
         
-        result = db.users.update_one(
+        result = await db.users.update_one(
             {"email": email},
             {"$set": filtered_data}
         )
@@ -180,7 +180,7 @@ def update_user_profile(email: str, update_data: dict):
 
 
 # Token blacklist operations
-def add_token_to_blacklist(token: str, email: str, expires_at: datetime):
+async def add_token_to_blacklist(token: str, email: str, expires_at: datetime):
     """Add a token to the blacklist."""
     try:
         db = get_database()
@@ -195,7 +195,7 @@ def add_token_to_blacklist(token: str, email: str, expires_at: datetime):
             "expires_at": expires_at
         }
         
-        result = db.token_blacklist.insert_one(blacklisted_token)
+        result = await db.token_blacklist.insert_one(blacklisted_token)
         success = result.inserted_id is not None
         if not success:
             logger.error("Failed to add token to blacklist")
@@ -205,7 +205,7 @@ def add_token_to_blacklist(token: str, email: str, expires_at: datetime):
         raise
 
 
-def is_token_blacklisted(token: str) -> bool:
+async def is_token_blacklisted(token: str) -> bool:
     """Check if a token is blacklisted."""
     try:
         db = get_database()
@@ -213,7 +213,7 @@ def is_token_blacklisted(token: str) -> bool:
             logger.error("Database connection is None")
             return False
         
-        blacklisted = db.token_blacklist.find_one({"token": token})
+        blacklisted = await db.token_blacklist.find_one({"token": token})
         is_blacklisted = blacklisted is not None
         return is_blacklisted
     except Exception as e:
@@ -221,8 +221,12 @@ def is_token_blacklisted(token: str) -> bool:
         raise
 
 
-def blacklist_user_tokens(email: str):
-    """Blacklist all tokens for a specific user (when account is deactivated)."""
+async def blacklist_user_tokens(email: str, expires_at: Optional[datetime] = None):
+    """Blacklist all tokens for a specific user (when account is deactivated).
+
+    ``expires_at`` should be when the last token issued so far expires; the
+    TTL index removes the marker then. Without it the marker is kept forever.
+    """
     try:
         db = get_database()
         if db is None:
@@ -235,8 +239,10 @@ def blacklist_user_tokens(email: str):
             "all_tokens": True,
             "blacklisted_at": datetime.utcnow()
         }
+        if expires_at is not None:
+            marker["expires_at"] = expires_at
         
-        result = db.token_blacklist.insert_one(marker)
+        result = await db.token_blacklist.insert_one(marker)
         success = result.inserted_id is not None
         if not success:
             logger.error("Failed to blacklist user tokens")
@@ -246,7 +252,7 @@ def blacklist_user_tokens(email: str):
         raise
 
 
-def cleanup_expired_tokens():
+async def cleanup_expired_tokens():
     """Clean up expired tokens from blacklist."""
     try:
         db = get_database()
@@ -254,7 +260,7 @@ def cleanup_expired_tokens():
             logger.error("Database connection is None")
             return False
         
-        result = db.token_blacklist.delete_many({
+        result = await db.token_blacklist.delete_many({
             "expires_at": {"$lt": datetime.utcnow()}
         })
         deleted_count = result.deleted_count
@@ -264,13 +270,13 @@ def cleanup_expired_tokens():
         raise
 
 
-def get_user_by_username(username: str):
+async def get_user_by_username(username: str):
     try:
         db = get_database()
         if db is None:
             logger.error("Database connection is None")
             return None
-        user = db.users.find_one({"username": username})
+        user = await db.users.find_one({"username": username})
         return user
     except Exception as e:
         logger.error(f"Error in get_user_by_username: {e}")
@@ -0,0 +1,173 @@
+from typing import Any, Dict, Optional
+import hashlib
+import io
+import logging
+import zipfile
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from .connection import get_database
+from .storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+async def _acquire_blob(digest: str) -> Optional[ObjectId]:
+    """Add a reference to an existing blob; its file ID, or None if there is none."""
+    blob = await get_database().theme_blobs.find_one_and_update(
+        {"_id": digest},
+        {"$inc": {"refs": 1}},
+        projection={"file_id": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return blob["file_id"] if blob else None
+
+
+async def store_blob(data: bytes, filename: str, content_type: str = "application/octet-stream") -> ObjectId:
+    """Store bytes once per SHA-256 and return the file ID holding them.
+
+    ``theme_blobs`` maps each digest to its file and a reference count. Bytes
+    already stored only gain a reference; nothing is written to the blob store.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    db = get_database()
+    store = get_blob_store()
+    while True:
+        file_id = await _acquire_blob(digest)
+        if file_id is not None:
+            return file_id
+        file_id = await store.put(data, filename, content_type, metadata={"sha256": digest})
+        try:
+            await db.theme_blobs.insert_one({
+                "_id": digest,
+                "file_id": file_id,
+                "size": len(data),
+                "refs": 1,
+                "created_at": datetime.utcnow()
+            })
+            return file_id
+        except DuplicateKeyError:
+            # Another upload of the same bytes won the race; reference its copy instead
+            await store.delete(file_id)
+
+
+async def release_blob(file_id: ObjectId) -> bool:
+    """Drop one reference to a stored file; returns True if its bytes were deleted.
+
+    Files stored before deduplication have no ``theme_blobs`` entry and are
+    deleted directly.
+    """
+    db = get_database()
+    store = get_blob_store()
+    blob = await db.theme_blobs.find_one_and_update(
+        {"file_id": file_id},
+        {"$inc": {"refs": -1}},
+        projection={"refs": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is None:
+        await store.delete(file_id)
+        return True
+    if blob["refs"] > 0:
+        return False
+    # Only the release that removes the entry frees the bytes; a concurrent
+    # store_blob that re-acquired it in between keeps the entry alive
+    result = await db.theme_blobs.delete_one({"_id": blob["_id"], "refs": {"$lte": 0}})
+    if result.deleted_count == 0:
+        return False
+    await store.delete(file_id)
+    return True
+
+
+def _ratio(logical: int, stored: int) -> float:
+    return logical / stored if stored else 1.0
+
+
+async def get_dedup_report() -> Dict[str, Any]:
+    """Measure how much storage deduplication saves on the current catalog.
+
+    ``members`` covers themes stored by member: the member bytes their ZIPs
+    reference (``logical_bytes``) against the distinct blobs holding them
+    (``stored_bytes``); it only reads manifests. ``files`` covers ZIPs still
+    stored whole: the bytes themes reference, what the blob store holds now
+    (``current_bytes``) and what it holds once every distinct content is
+    stored once. ``unsplit_members`` does the same for the files inside those
+    ZIPs, i.e. what ``split_theme_zips`` would save. Reads every whole ZIP
+    once, one at a time.
+    """
+    db = get_database()
+    store = get_blob_store()
+    references: Dict[str, int] = {}
+    member_themes = member_logical = 0
+    member_blobs: Dict[Any, int] = {}
+    async for theme in db.themes.find({}, {"zip_file_id": 1, "zip.members": 1}):
+        if theme.get("zip_file_id"):
+            references[theme["zip_file_id"]] = references.get(theme["zip_file_id"], 0) + 1
+        elif theme.get("zip"):
+            member_themes += 1
+            for member in theme["zip"]["members"]:
+                member_logical += member["compressed_size"]
+                member_blobs[member["file_id"]] = member["compressed_size"]
+
+    file_logical = file_current = file_stored = 0
+    unsplit_logical = unsplit_stored = 0
+    file_digests: Dict[str, int] = {}
+    unsplit_digests: Dict[str, int] = {}
+    unreadable = 0
+    for file_id, refs in references.items():
+        try:
+            file_obj = await store.open(ObjectId(file_id))
+            try:
+                data = await file_obj.read()
+            finally:
+                await file_obj.close()
+        except Exception as e:
+            logger.warning(f"Could not read ZIP file {file_id}: {e}")
+            unreadable += 1
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        file_logical += len(data) * refs
+        file_current += len(data)
+        if digest not in file_digests:
+            file_digests[digest] = len(data)
+            file_stored += len(data)
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    member = archive.read(info)
+                    unsplit_logical += len(member) * refs
+                    member_digest = hashlib.sha256(member).hexdigest()
+                    if member_digest not in unsplit_digests:
+                        unsplit_digests[member_digest] = len(member)
+                        unsplit_stored += len(member)
+        except zipfile.BadZipFile:
+            logger.warning(f"Stored file {file_id} is not a valid ZIP")
+
+    member_stored = sum(member_blobs.values())
+    return {
+        "themes": sum(references.values()) + member_themes,
+        "unreadable_files": unreadable,
+        "members": {
+            "themes": member_themes,
+            "distinct_contents": len(member_blobs),
+            "logical_bytes": member_logical,
+            "stored_bytes": member_stored,
+            "ratio": _ratio(member_logical, member_stored)
+        },
+        "files": {
+            "themes": sum(references.values()),
+            "distinct_ids": len(references),
+            "distinct_contents": len(file_digests),
+            "logical_bytes": file_logical,
+            "current_bytes": file_current,
+            "stored_bytes": file_stored,
+            "ratio": _ratio(file_logical, file_stored)
+        },
+        "unsplit_members": {
+            "distinct_contents": len(unsplit_digests),
+            "logical_bytes": unsplit_logical,
+            "stored_bytes": unsplit_stored,
+            "ratio": _ratio(unsplit_logical, unsplit_stored)
+        }
+    }
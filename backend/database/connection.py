@@ -1,8 +1,8 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 import os
 from typing import Optional
 import logging
-from gridfs import GridFS
+from gridfs import AsyncGridFS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -13,19 +13,22 @@ MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "switch_theme")
 
 # Database client - lazy initialization for serverless
-_client: Optional[MongoClient] = None
+_client: Optional[AsyncMongoClient] = None
 _database = None
 
 
-def get_client() -> MongoClient:
-    """Get MongoDB client with lazy initialization."""
+def get_client() -> AsyncMongoClient:
+    """Get the asyncio MongoDB client with lazy initialization.
+
+    The client connects on first use, so creating it never blocks the event loop.
+    """
     global _client
     if _client is None:
         try:
             logger.info(f"Initializing MongoDB client")
-            _client = MongoClient(
+            _client = AsyncMongoClient(
                 MONGODB_URL,
-                maxPoolSize=10,
+                maxPoolSize=int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
                 minPoolSize=0,
                 maxIdleTimeMS=30000,
                 serverSelectionTimeoutMS=5000,
@@ -53,11 +56,11 @@ def get_database():
     return _database
 
 
-def test_connection():
+async def test_connection():
     """Test database connection safely for serverless."""
     try:
         db = get_database()
-        db.command("ping")
+        await db.command("ping")
         logger.info("Database connection test successful")
         return True
     except Exception as e:
@@ -71,15 +74,18 @@ def connect_to_mongo():
     logger.info("MongoDB client initialized")
 
 
-def close_mongo_connection():
+async def close_mongo_connection():
     """Close MongoDB connection (for compatibility)."""
-    global _client
+    global _client, _database
     if _client:
-        _client.close()
+        await _client.close()
         _client = None
-        logger.info("MongoDB client closed") 
+        _database = None
+        logger.info("MongoDB client closed")
+
 
-def get_fs(db):
+def get_fs(db=None) -> AsyncGridFS:
+    """Get the asyncio GridFS instance used for theme files."""
     if db is None:
         db = get_database()
-    return GridFS(db, collection="theme_files")
\ No newline at end of file
+    return AsyncGridFS(db, collection="theme_files")
@@ -9,7 +9,7 @@ logger = logging.getLogger(__name__)
 
 
 # Contact message operations
-def create_contact_message(name: str, email: str, subject: str, message: str):
+async def create_contact_message(name: str, email: str, subject: str, message: str):
     """Create a new contact message in MongoDB."""
     try:
         db = get_database()
@@ -29,7 +29,7 @@ def create_contact_message(name: str, email: str, subject: str, message: str):
         }
         
         logger.info(f"Attempting to insert contact message with ID: {message_id}")
-        result = db.contact_messages.insert_one(contact_message)
+        result = await db.contact_messages.insert_one(contact_message)
         if result.inserted_id:
             logger.info(f"Contact message inserted successfully with ID: {result.inserted_id}")
             return contact_message
@@ -41,7 +41,7 @@ def create_contact_message(name: str, email: str, subject: str, message: str):
         raise
 
 
-def get_contact_messages(limit: int = 50, skip: int = 0):
+async def get_contact_messages(limit: int = 50, skip: int = 0):
     """Get contact messages with pagination."""
     try:
         db = get_database()
@@ -50,7 +50,7 @@ def get_contact_messages(limit: int = 50, skip: int = 0):
             return []
         
         cursor = db.contact_messages.find().sort("created_at", -1).skip(skip).limit(limit)
-        messages = list(cursor)
+        messages = await cursor.to_list()
         logger.info(f"Retrieved {len(messages)} contact messages")
         return messages
     except Exception as e:
@@ -58,7 +58,7 @@ def get_contact_messages(limit: int = 50, skip: int = 0):
         raise
 
 
-def get_contact_message_by_id(message_id: str):
+async def get_contact_message_by_id(message_id: str):
     """Get a specific contact message by ID."""
     try:
         db = get_database()
@@ -66,7 +66,7 @@ def get_contact_message_by_id(message_id: str):
             logger.error("Database connection is None")
             return None
         
-        message = db.contact_messages.find_one({"_id": message_id})
+        message = await db.contact_messages.find_one({"_id": message_id})
         if message:
             logger.info(f"Retrieved contact message with ID: {message_id}")
         else:
@@ -77,7 +77,7 @@ def get_contact_message_by_id(message_id: str):
         raise
 
 
-def update_contact_message_status(message_id: str, status: str):
+async def update_contact_message_status(message_id: str, status: str):
     """Update the status of a contact message."""
     try:
         db = get_database()
@@ -85,7 +85,7 @@ def update_contact_message_status(message_id: str, status: str):
             logger.error("Database connection is None")
             return False
         
-        result = db.contact_messages.update_one(
+        result = await db.contact_messages.update_one(
             {"_id": message_id},
             {"$set": {"status": status}}
         )
@@ -0,0 +1,65 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from .connection import get_database
+
+logger = logging.getLogger(__name__)
+
+
+async def _upsert_counter(name: str, update: dict) -> dict:
+    """Apply an update to a counter document, creating it if needed."""
+    counters_collection = get_database().counters
+    try:
+        return await counters_collection.find_one_and_update(
+            {"_id": name}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Two workers raced to create the document; it exists now
+        return await counters_collection.find_one_and_update(
+            {"_id": name}, update, return_document=ReturnDocument.AFTER
+        )
+
+
+class SequenceAllocator:
+    """Hands out unique, increasing integers from a document in ``counters``.
+
+    Each reservation is a single atomic ``$inc`` (find-and-modify), so IDs never
+    collide across workers. With ``block_size > 1`` a worker reserves a whole
+    block per round trip and serves the rest from memory; IDs left in a block
+    when the process exits are skipped, not reused.
+
+    ``seed`` returns the highest ID already in use. It runs once per process
+    so a counter introduced on existing data starts above it.
+    """
+
+    def __init__(self, name: str, block_size: int = 1, seed: Optional[Callable[[], Awaitable[int]]] = None):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.name = name
+        self.block_size = block_size
+        self._seed = seed
+        self._seeded = seed is None
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _reserve_block(self):
+        if not self._seeded:
+            floor = await self._seed()
+            if floor:
+                await _upsert_counter(self.name, {"$max": {"value": floor}})
+            self._seeded = True
+        counter = await _upsert_counter(self.name, {"$inc": {"value": self.block_size}})
+        self._end = counter["value"] + 1
+        self._next = self._end - self.block_size
+
+    async def next(self) -> int:
+        """Return the next ID, reserving a new block if the current one is spent."""
+        async with self._lock:
+            if self._next >= self._end:
+                await self._reserve_block()
+            value = self._next
+            self._next += 1
+            return value
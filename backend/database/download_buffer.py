@@ -0,0 +1,133 @@
+from collections import Counter
+from typing import Dict, Optional, Set
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pymongo import UpdateOne
+from .connection import get_database
+from .suggestions import suggestion_index
+from .theme import theme_cache
+from .trending import download_increment
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCounterBuffer:
+    """Collects download increments in memory and writes them in batches.
+
+    ``record`` never touches the database. Pending counts are flushed as one
+    unordered ``bulk_write`` every ``flush_interval`` seconds, as soon as
+    ``max_pending`` downloads are waiting (one early flush at a time), and on
+    shutdown. Counts from a failed flush are kept for the next one.
+
+    Unwritten downloads, pending plus the batch being written, never exceed
+    ``max_unflushed`` (``2 * max_pending``): past it ``record`` drops new
+    downloads and a failed batch that doesn't fit is dropped, both logged.
+    So a crash loses at most ``max_unflushed`` downloads and memory stays
+    bounded while the database is slow or down.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, max_pending: int = 500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_unflushed = 2 * max_pending
+        self._pending: Counter = Counter()
+        self._pending_total = 0
+        self._in_flight = 0
+        self.dropped = 0
+        self._dropping = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return self._pending_total
+
+    def record(self, theme_id: int, count: int = 1):
+        """Count downloads of a theme (by integer theme_id) without waiting on the database."""
+        if self._pending_total + self._in_flight + count > self.max_unflushed:
+            self.dropped += count
+            if not self._dropping:
+                self._dropping = True
+                logger.error(f"{self._pending_total + self._in_flight} downloads are unwritten; dropping new ones until a flush succeeds")
+            return
+        self._pending[theme_id] += count
+        self._pending_total += count
+        # One early flush at a time; a slow or failing database must not pile up tasks
+        if self._pending_total >= self.max_pending and not self._flush_tasks and not self._lock.locked():
+            task = asyncio.create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> int:
+        """Write every pending increment; returns the number of downloads flushed."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch: Dict[int, int] = self._pending
+            batch_total = self._pending_total
+            self._pending, self._pending_total = Counter(), 0
+            self._in_flight = batch_total
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne({"theme_id": theme_id}, download_increment(count, now))
+                for theme_id, count in batch.items()
+            ]
+            try:
+                await get_database().themes.bulk_write(operations, ordered=False)
+            except Exception as e:
+                logger.error(f"Error flushing {len(operations)} download counters: {e}")
+                # Keep the counts for the next attempt while staying within the bound
+                if self._pending_total + batch_total <= self.max_unflushed:
+                    self._pending.update(batch)
+                    self._pending_total += batch_total
+                else:
+                    self.dropped += batch_total
+                    logger.error(f"Dropped {batch_total} downloads of {len(batch)} themes; {self._pending_total} already pending")
+                return 0
+            finally:
+                self._in_flight = 0
+            if self._dropping:
+                self._dropping = False
+                logger.warning(f"Download counting resumed; {self.dropped} downloads dropped in total")
+            for theme_id, count in batch.items():
+                theme_cache.invalidate(theme_id)
+                suggestion_index.record_downloads(theme_id, count)
+            return batch_total
+
+    async def _run(self):
+        while True:
+            # Wake early on stop(); a flush already under way is never interrupted
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Download counter flush loop error: {e}")
+
+    def start(self):
+        """Start the periodic flush loop on the running event loop."""
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop, let running flushes finish, then write whatever is still pending."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+
+
+download_counter = DownloadCounterBuffer(
+    flush_interval=float(os.getenv("DOWNLOAD_FLUSH_INTERVAL", "5")),
+    max_pending=int(os.getenv("DOWNLOAD_FLUSH_MAX_PENDING", "500")),
+)
@@ -0,0 +1,305 @@
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# GridFS default chunk size; cached files are handed out in slices of this size
+CACHED_CHUNK_SIZE = 255 * 1024
+
+
+class CachedFile:
+    """An in-memory file with the parts of ``AsyncGridOut`` the download path uses.
+
+    ``iter_file_chunks``, ``iter_file_range`` and ``get_file_digest`` accept
+    it in place of a GridFS file.
+    """
+
+    def __init__(self, file_id: Any, data: bytes, upload_date: Optional[datetime], metadata: Optional[Dict[str, Any]], md5: Optional[str] = None):
+        self._id = file_id
+        self._data = memoryview(data)
+        self.length = len(data)
+        self.upload_date = upload_date
+        self.metadata = metadata
+        self.md5 = md5
+        self._position = 0
+
+    @property
+    def data(self) -> bytes:
+        return self._data.obj
+
+    async def seek(self, pos: int) -> int:
+        self._position = max(0, min(pos, self.length))
+        return self._position
+
+    async def readchunk(self) -> bytes:
+        # Stop at the next chunk boundary, as GridFS does after a seek
+        end = min(self.length, (self._position // CACHED_CHUNK_SIZE + 1) * CACHED_CHUNK_SIZE)
+        chunk = bytes(self._data[self._position:end])
+        self._position = end
+        return chunk
+
+    async def read(self, size: int = -1) -> bytes:
+        end = self.length if size < 0 else min(self.length, self._position + size)
+        data = bytes(self._data[self._position:end])
+        self._position = end
+        return data
+
+    async def close(self):
+        pass
+
+
+class HotFileCache:
+    """Byte-bounded two-tier cache of file payloads keyed by file ID.
+
+    The most frequently requested files are kept in memory (up to
+    ``memory_bytes``); files pushed out of memory spill to ``disk_dir`` (up
+    to ``disk_bytes``, 0 disables the disk tier). Both tiers evict the least
+    frequently used entry, the least recently used one among ties. Request
+    counts are halved every ``aging_interval`` lookups so files that cool
+    down lose their place.
+
+    A file is only admitted once it has been requested ``min_hits`` times and
+    if it is no larger than ``max_entry_bytes``. Each process spills to its
+    own ``worker-<pid>`` subdirectory of ``disk_dir``; the first spill removes
+    the subdirectories of processes that are no longer running. Not
+    thread-safe; it is meant to be used from the event loop. Entries are per worker, so a delete only
+    invalidates the worker that ran it; file IDs are never reused, so other
+    workers can at worst serve a deleted file until it is evicted.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = 64 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+        max_entry_bytes: int = 16 * 1024 * 1024,
+        min_hits: int = 2,
+        disk_dir: Optional[str] = None,
+        aging_interval: int = 10000,
+        name: str = "hot_files"
+    ):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.min_hits = min_hits
+        self.disk_root = disk_dir or os.path.join(tempfile.gettempdir(), "theme-file-cache")
+        self.disk_dir = os.path.join(self.disk_root, f"worker-{os.getpid()}")
+        self._disk_ready = False
+        self.aging_interval = aging_interval
+        self.name = name
+        self._memory: "OrderedDict[Hashable, CachedFile]" = OrderedDict()
+        self._memory_size = 0
+        # Disk entries keep their metadata in memory; the payload is read back on a hit
+        self._disk: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._disk_size = 0
+        self._frequency: Counter = Counter()
+        self._lookups_since_aging = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+    def _record_request(self, key: Hashable):
+        self._frequency[key] += 1
+        self._lookups_since_aging += 1
+        if self._lookups_since_aging >= self.aging_interval:
+            self._lookups_since_aging = 0
+            for other, count in list(self._frequency.items()):
+                if count > 1 or other in self._memory or other in self._disk:
+                    self._frequency[other] = max(1, count // 2)
+                else:
+                    del self._frequency[other]
+
+    def _coldest(self, entries: OrderedDict) -> Hashable:
+        # Iteration runs from least to most recently used, so min() breaks ties by recency
+        return min(entries, key=lambda key: self._frequency[key])
+
+    def _disk_path(self, key: Hashable) -> str:
+        return os.path.join(self.disk_dir, f"{key}.bin")
+
+    async def get(self, key: Hashable) -> Optional[CachedFile]:
+        """Cached copy of a file, or None on a miss. Counts as a request for admission."""
+        self._record_request(key)
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.bytes_served += cached.length
+            return CachedFile(cached._id, cached.data, cached.upload_date, cached.metadata, cached.md5)
+        info = self._disk.pop(key, None)
+        if info is not None:
+            self._disk_size -= info["size"]
+            try:
+                data = await asyncio.to_thread(_read_file, self._disk_path(key))
+                if len(data) != info["size"]:
+                    raise OSError(f"expected {info['size']} bytes, found {len(data)}")
+            except OSError as e:
+                logger.warning(f"Could not read cached file {key}: {e}")
+                await asyncio.to_thread(_remove_file, self._disk_path(key))
+                self.misses += 1
+                return None
+            await asyncio.to_thread(_remove_file, self._disk_path(key))
+            self.disk_hits += 1
+            self.bytes_served += len(data)
+            cached = CachedFile(info["file_id"], data, info["upload_date"], info["metadata"], info["md5"])
+            await self._store_memory(key, cached)
+            return CachedFile(cached._id, cached.data, cached.upload_date, cached.metadata, cached.md5)
+        self.misses += 1
+        return None
+
+    def should_admit(self, key: Hashable, size: int) -> bool:
+        """Whether a file just missed is hot and small enough to be cached."""
+        return size <= self.max_entry_bytes and size <= self.memory_bytes and self._frequency[key] >= self.min_hits
+
+    async def put(self, key: Hashable, cached: CachedFile):
+        """Cache a file's payload in the memory tier, spilling colder files to disk."""
+        if cached.length > self.max_entry_bytes or cached.length > self.memory_bytes:
+            return
+        await self.invalidate(key)
+        await self._store_memory(key, cached)
+
+    async def _store_memory(self, key: Hashable, cached: CachedFile):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= previous.length
+        self._memory[key] = cached
+        self._memory_size += cached.length
+        while self._memory_size > self.memory_bytes:
+            victim = self._coldest(self._memory)
+            spilled = self._memory.pop(victim)
+            self._memory_size -= spilled.length
+            await self._store_disk(victim, spilled)
+
+    async def _store_disk(self, key: Hashable, cached: CachedFile):
+        if cached.length > self.disk_bytes:
+            self.evictions += 1
+            return
+        try:
+            if not self._disk_ready:
+                await asyncio.to_thread(_prepare_disk_dir, self.disk_root, self.disk_dir)
+                self._disk_ready = True
+            await asyncio.to_thread(_write_file, self.disk_dir, self._disk_path(key), cached.data)
+        except OSError as e:
+            logger.warning(f"Could not spill cached file {key} to disk: {e}")
+            self.evictions += 1
+            return
+        previous = self._disk.pop(key, None)
+        if previous is not None:
+            self._disk_size -= previous["size"]
+        self._disk[key] = {
+            "file_id": cached._id,
+            "size": cached.length,
+            "upload_date": cached.upload_date,
+            "metadata": cached.metadata,
+            "md5": cached.md5
+        }
+        self._disk_size += cached.length
+        while self._disk_size > self.disk_bytes:
+            victim = self._coldest(self._disk)
+            self._disk_size -= self._disk.pop(victim)["size"]
+            await asyncio.to_thread(_remove_file, self._disk_path(victim))
+            self.evictions += 1
+
+    async def invalidate(self, key: Hashable):
+        """Drop a file from both tiers, e.g. after it was deleted."""
+        cached = self._memory.pop(key, None)
+        if cached is not None:
+            self._memory_size -= cached.length
+        info = self._disk.pop(key, None)
+        if info is not None:
+            self._disk_size -= info["size"]
+            await asyncio.to_thread(_remove_file, self._disk_path(key))
+
+    async def clear(self):
+        for key in list(self._memory) + list(self._disk):
+            await self.invalidate(key)
+        self._frequency.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._memory) + len(self._disk),
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "max_memory_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+            "max_disk_bytes": self.disk_bytes,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "bytes_served": self.bytes_served
+        }
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(directory: str, path: str, data: bytes):
+    # Write beside the target and rename, so a reader never sees a partial file
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _prepare_disk_dir(root: str, directory: str):
+    """Create this process's spill directory, removing leftovers of dead processes.
+
+    A leftover directory under our own PID is from an earlier process that
+    had the same PID, so it is emptied too.
+    """
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            pid = name[len("worker-"):]
+            if not name.startswith("worker-") or not pid.isdigit():
+                continue
+            if path == directory or not _process_alive(int(pid)):
+                shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Popular theme files (ZIP members, and ZIPs stored whole) by blob file ID
+theme_file_cache = HotFileCache(
+    memory_bytes=int(os.getenv("FILE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+    disk_bytes=int(os.getenv("FILE_CACHE_DISK_BYTES", str(512 * 1024 * 1024))),
+    max_entry_bytes=int(os.getenv("FILE_CACHE_MAX_ENTRY_BYTES", str(16 * 1024 * 1024))),
+    min_hits=int(os.getenv("FILE_CACHE_MIN_HITS", "2")),
+    disk_dir=os.getenv("FILE_CACHE_DIR") or None,
+    name="theme_files"
+)
@@ -0,0 +1,172 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import asyncio
+import base64
+import hashlib
+import logging
+from datetime import datetime
+from .connection import get_database
+from utils.image_variants import VARIANT_FORMATS, VARIANT_WIDTHS, generate_variants, variant_name
+
+logger = logging.getLogger(__name__)
+
+IMAGE_KINDS = ("preview", "icon")
+ORIGINAL_VARIANT = "original"
+
+
+def _image_doc(theme_id: int, kind: str, data: bytes, content_type: str, variant: str) -> Dict[str, Any]:
+    return {
+        "theme_id": theme_id,
+        "kind": kind,
+        "variant": variant,
+        "content_type": content_type,
+        "data": data,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "created_at": datetime.utcnow()
+    }
+
+
+async def store_theme_image(theme_id: int, kind: str, data: bytes, content_type: str = "image/png", variant: str = ORIGINAL_VARIANT) -> Dict[str, Any]:
+    """Store (or replace) one image of a theme as binary in ``theme_images``."""
+    try:
+        db = get_database()
+        image_doc = _image_doc(theme_id, kind, data, content_type, variant)
+        await db.theme_images.replace_one(
+            {"theme_id": theme_id, "kind": kind, "variant": variant},
+            image_doc,
+            upsert=True
+        )
+        return image_doc
+    except Exception as e:
+        logger.error(f"Error storing {kind} image for theme {theme_id}: {e}")
+        raise
+
+
+async def get_theme_image(theme_id: int, kind: str, variant: str = ORIGINAL_VARIANT) -> Optional[Dict[str, Any]]:
+    """Get a theme image with its ``data``, ``content_type``, ``sha256`` and ``created_at``.
+
+    Falls back to the legacy ``<kind>_b64`` field for themes that have not
+    been through ``migrate_embedded_images`` yet.
+    """
+    try:
+        db = get_database()
+        image_doc = await db.theme_images.find_one({"theme_id": theme_id, "kind": kind, "variant": variant})
+        if image_doc or variant != ORIGINAL_VARIANT:
+            return image_doc
+        field = f"{kind}_b64"
+        theme_doc = await db.themes.find_one({"theme_id": theme_id}, {field: 1, "created_at": 1})
+        if theme_doc and theme_doc.get(field):
+            image_doc = _image_doc(theme_id, kind, base64.b64decode(theme_doc[field]), "image/png", variant)
+            image_doc["created_at"] = theme_doc.get("created_at", image_doc["created_at"])
+            return image_doc
+        return None
+    except Exception as e:
+        logger.error(f"Error getting {kind} image for theme {theme_id}: {e}")
+        raise
+
+
+async def store_preview_variants(theme_id: int, preview: bytes, executor: Optional[Executor] = None) -> List[str]:
+    """Generate the resized preview variants off the event loop and store them.
+
+    Runs on the default thread pool unless an ``executor`` is given.
+    """
+    loop = asyncio.get_running_loop()
+    variants = await loop.run_in_executor(executor, generate_variants, preview)
+    for name, (data, content_type) in variants.items():
+        await store_theme_image(theme_id, "preview", data, content_type, variant=name)
+    return list(variants)
+
+
+async def delete_theme_images(theme_id: int) -> int:
+    """Delete every stored image and variant of a theme."""
+    try:
+        db = get_database()
+        result = await db.theme_images.delete_many({"theme_id": theme_id})
+        return result.deleted_count
+    except Exception as e:
+        logger.error(f"Error deleting images for theme {theme_id}: {e}")
+        raise
+
+
+async def migrate_embedded_images(batch_size: int = 100) -> int:
+    """Move ``preview_b64``/``icon_b64`` out of theme documents into ``theme_images``.
+
+    Each theme's fields are only unset after its images are stored, so the
+    migration can be interrupted and rerun. Themes are walked in ``_id``
+    order; one that can't be moved (no theme_id, undecodable image) is logged
+    and left as it is, and the next run tries it again. Returns the number of
+    themes moved.
+    """
+    db = get_database()
+    legacy_fields = [f"{kind}_b64" for kind in IMAGE_KINDS]
+    query = {"$or": [{field: {"$exists": True}} for field in legacy_fields]}
+    projection = {"theme_id": 1, **{field: 1 for field in legacy_fields}}
+    migrated = failed = 0
+    last_id = None
+    while True:
+        page_query = {"$and": [query, {"_id": {"$gt": last_id}}]} if last_id is not None else query
+        themes = await db.themes.find(page_query, projection).sort("_id", 1).limit(batch_size).to_list()
+        if not themes:
+            break
+        for theme in themes:
+            last_id = theme["_id"]
+            theme_id = theme.get("theme_id")
+            if theme_id is None:
+                logger.warning(f"Skipping theme document {theme['_id']} without a theme_id")
+                failed += 1
+                continue
+            try:
+                for kind in IMAGE_KINDS:
+                    encoded = theme.get(f"{kind}_b64")
+                    if encoded:
+                        await store_theme_image(theme_id, kind, base64.b64decode(encoded))
+            except Exception as e:
+                logger.error(f"Could not move images of theme {theme_id}: {e}")
+                failed += 1
+                continue
+            await db.themes.update_one(
+                {"_id": theme["_id"]},
+                {"$unset": {field: "" for field in legacy_fields}}
+            )
+            migrated += 1
+        logger.info(f"Moved images out of {migrated} themes, {failed} skipped")
+    return migrated
+
+
+async def backfill_preview_variants(workers: int = 4) -> int:
+    """Generate missing preview variants for stored themes, ``workers`` at a time.
+
+    Resizing runs in a process pool so it uses every core. Themes whose
+    previews are still embedded need ``migrate_embedded_images`` first.
+    Returns the number of themes processed.
+    """
+    db = get_database()
+    expected = [variant_name(width, image_format) for width in VARIANT_WIDTHS for image_format in VARIANT_FORMATS]
+    pipeline = [
+        {"$match": {"kind": "preview"}},
+        {"$group": {"_id": "$theme_id", "variants": {"$addToSet": "$variant"}}},
+        {"$match": {"$and": [
+            {"variants": ORIGINAL_VARIANT},
+            {"variants": {"$not": {"$all": expected}}}
+        ]}}
+    ]
+    cursor = await db.theme_images.aggregate(pipeline)
+    theme_ids = [group["_id"] for group in await cursor.to_list()]
+    semaphore = asyncio.Semaphore(workers)
+
+    async def backfill(theme_id: int, executor: Executor) -> bool:
+        async with semaphore:
+            try:
+                original = await get_theme_image(theme_id, "preview")
+                await store_preview_variants(theme_id, original["data"], executor)
+                return True
+            except Exception as e:
+                logger.error(f"Could not generate preview variants for theme {theme_id}: {e}")
+                return False
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = await asyncio.gather(*(backfill(theme_id, executor) for theme_id in theme_ids))
+    processed = sum(results)
+    logger.info(f"Generated preview variants for {processed} of {len(theme_ids)} themes")
+    return processed
@@ -0,0 +1,132 @@
+from typing import Dict, List
+import logging
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from .connection import get_database
+
+logger = logging.getLogger(__name__)
+
+
+# Indexes the query layer relies on, per collection. Names are explicit so
+# reruns are no-ops and the check below can compare against what exists.
+EXPECTED_INDEXES: Dict[str, List[IndexModel]] = {
+    "themes": [
+        IndexModel([("theme_id", ASCENDING)], name="theme_id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_desc"),
+        IndexModel([("download_count", DESCENDING), ("_id", DESCENDING)], name="download_count_desc"),
+        IndexModel([("tags", ASCENDING), ("created_at", DESCENDING)], name="tags_created_at"),
+        IndexModel([("trending.24h", DESCENDING), ("_id", DESCENDING)], name="trending_24h_desc"),
+        IndexModel([("trending.7d", DESCENDING), ("_id", DESCENDING)], name="trending_7d_desc"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_id_created_at_id"),
+        # Catalog search: stemmed, phrase-aware and ranked by these weights
+        IndexModel(
+            [("name", TEXT), ("tags", TEXT), ("author_name", TEXT), ("short_description", TEXT), ("description", TEXT)],
+            name="theme_search",
+            weights={"name": 10, "tags": 6, "author_name": 4, "short_description": 2, "description": 1},
+            default_language="english",
+        ),
+    ],
+    "theme_images": [
+        IndexModel(
+            [("theme_id", ASCENDING), ("kind", ASCENDING), ("variant", ASCENDING)],
+            name="theme_image_unique",
+            unique=True,
+        ),
+    ],
+    "theme_blobs": [
+        IndexModel([("file_id", ASCENDING)], name="file_id_unique", unique=True),
+    ],
+    "tag_stats": [
+        IndexModel([("count", DESCENDING), ("_id", ASCENDING)], name="count_desc"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "deactivated_users": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("username", ASCENDING)], name="username"),
+    ],
+    "token_blacklist": [
+        IndexModel([("token", ASCENDING)], name="token"),
+        IndexModel([("email", ASCENDING)], name="email"),
+        # Expired tokens, and all-token markers once every token they cover has
+        # expired, are removed by the server instead of cleanup_expired_tokens
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+# Indexes earlier versions created that an expected index now replaces, per
+# collection; ensure_indexes drops them so they stop costing every write
+SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    # Replaced by user_id_created_at_id, which also serves keyset pagination
+    "themes": ["user_id_created_at"],
+}
+
+# Server error code for dropping an index that does not exist
+INDEX_NOT_FOUND = 27
+
+
+def _key_pattern(index) -> list:
+    """Normalize an index key document to a comparable list of (field, direction)."""
+    return [(field, direction) for field, direction in index.items()]
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create every expected index. Safe to run repeatedly.
+
+    Returns the index names created (or confirmed) per collection. Failures on
+    one index, e.g. a unique index blocked by duplicate data, are logged and
+    don't stop the others. Indexes in ``SUPERSEDED_INDEXES`` are dropped once
+    every expected index of their collection exists.
+    """
+    db = get_database()
+    results: Dict[str, List[str]] = {}
+    failed = set()
+    for collection_name, models in EXPECTED_INDEXES.items():
+        collection = db[collection_name]
+        created = []
+        for model in models:
+            try:
+                created += await collection.create_indexes([model])
+            except OperationFailure as e:
+                logger.error(f"Could not create index {model.document['name']} on {collection_name}: {e}")
+                failed.add(collection_name)
+        results[collection_name] = created
+    for collection_name, names in SUPERSEDED_INDEXES.items():
+        if collection_name in failed:
+            continue
+        for name in names:
+            try:
+                await db[collection_name].drop_index(name)
+                logger.info(f"Dropped superseded index {name} on {collection_name}")
+            except OperationFailure as e:
+                if e.code != INDEX_NOT_FOUND:
+                    logger.error(f"Could not drop superseded index {name} on {collection_name}: {e}")
+    logger.info("Database indexes ensured")
+    return results
+
+
+async def get_missing_indexes() -> Dict[str, List[str]]:
+    """Report expected indexes that are not present on the server.
+
+    Indexes match by key pattern, or by name for text indexes, whose stored key
+    (``_fts``/``_ftsx``) differs from the declared one.
+    """
+    db = get_database()
+    missing: Dict[str, List[str]] = {}
+    for collection_name, models in EXPECTED_INDEXES.items():
+        cursor = await db[collection_name].list_indexes()
+        indexes = await cursor.to_list()
+        existing_keys = [_key_pattern(index["key"]) for index in indexes]
+        existing_names = {index["name"] for index in indexes}
+        absent = [
+            model.document["name"]
+            for model in models
+            if _key_pattern(model.document["key"]) not in existing_keys
+            and model.document["name"] not in existing_names
+        ]
+        if absent:
+            missing[collection_name] = absent
+    return missing
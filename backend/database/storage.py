@@ -0,0 +1,254 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from bson import ObjectId
+from gridfs.errors import NoFile
+from .connection import get_database, get_fs
+
+logger = logging.getLogger(__name__)
+
+# Matches the GridFS default so both backends hand out chunks of the same size
+LOCAL_CHUNK_SIZE = 255 * 1024
+
+
+class BlobStore(ABC):
+    """Where theme file bytes live, addressed by ObjectId.
+
+    ``open`` returns an object with the parts of ``AsyncGridOut`` the rest of
+    the code uses: ``_id``, ``length``, ``upload_date``, ``metadata``,
+    ``md5``, ``filename``, ``content_type`` and async ``seek``, ``readchunk``,
+    ``read`` and ``close``.
+    """
+
+    name = "blob"
+    # Files are plain paths on this machine and can be sent with sendfile
+    zero_copy = False
+
+    @abstractmethod
+    async def put(self, data: bytes, filename: str, content_type: str, metadata: Optional[Dict[str, Any]] = None, file_id: Optional[ObjectId] = None) -> ObjectId:
+        """Store bytes, under ``file_id`` if given, and return their ID."""
+
+    @abstractmethod
+    async def open(self, file_id: ObjectId):
+        """Open a stored file for reading; raises ``FileNotFoundError`` if it is missing."""
+
+    @abstractmethod
+    async def delete(self, file_id: ObjectId):
+        """Delete a stored file; missing files are ignored."""
+
+    @abstractmethod
+    async def exists(self, file_id: ObjectId) -> bool:
+        """Whether a file is stored under ``file_id``."""
+
+    @abstractmethod
+    def iter_ids(self) -> AsyncIterator[ObjectId]:
+        """Yield the ID of every stored file."""
+
+
+class GridFSStore(BlobStore):
+    """Files in the ``theme_files`` GridFS bucket of the application database."""
+
+    name = "gridfs"
+
+    async def put(self, data: bytes, filename: str, content_type: str, metadata: Optional[Dict[str, Any]] = None, file_id: Optional[ObjectId] = None) -> ObjectId:
+        extra = {"_id": file_id} if file_id is not None else {}
+        return await get_fs().put(data, filename=filename, content_type=content_type, metadata=metadata, **extra)
+
+    async def open(self, file_id: ObjectId):
+        try:
+            return await get_fs().get(file_id)
+        except NoFile as e:
+            raise FileNotFoundError(f"No file {file_id} in GridFS") from e
+
+    async def delete(self, file_id: ObjectId):
+        await get_fs().delete(file_id)
+
+    async def exists(self, file_id: ObjectId) -> bool:
+        return await get_fs().exists(file_id)
+
+    async def iter_ids(self) -> AsyncIterator[ObjectId]:
+        async for doc in get_database()["theme_files.files"].find({}, {"_id": 1}):
+            yield doc["_id"]
+
+
+class LocalFile:
+    """A file of ``LocalFileStore`` opened for reading; blocking I/O runs in a thread."""
+
+    def __init__(self, path: str, info: Dict[str, Any]):
+        self.path = path
+        self._id = ObjectId(info["_id"])
+        self.length = info["length"]
+        self.filename = info.get("filename")
+        self.content_type = info.get("content_type")
+        self.metadata = info.get("metadata")
+        self.md5 = None
+        self.upload_date = datetime.fromisoformat(info["upload_date"]) if info.get("upload_date") else None
+        self._file = None
+        self._position = 0
+
+    async def _handle(self):
+        if self._file is None:
+            self._file = await asyncio.to_thread(open, self.path, "rb")
+        return self._file
+
+    async def seek(self, pos: int) -> int:
+        self._position = max(0, min(pos, self.length))
+        return self._position
+
+    def _read_at(self, handle, position: int, size: int) -> bytes:
+        handle.seek(position)
+        return handle.read(size)
+
+    async def readchunk(self) -> bytes:
+        # Stop at the next chunk boundary, as GridFS does after a seek
+        end = min(self.length, (self._position // LOCAL_CHUNK_SIZE + 1) * LOCAL_CHUNK_SIZE)
+        return await self.read(end - self._position)
+
+    async def read(self, size: int = -1) -> bytes:
+        end = self.length if size < 0 else min(self.length, self._position + size)
+        if end <= self._position:
+            return b""
+        data = await asyncio.to_thread(self._read_at, await self._handle(), self._position, end - self._position)
+        self._position += len(data)
+        return data
+
+    async def close(self):
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+
+class LocalFileStore(BlobStore):
+    """Files on the local filesystem under ``root``, for single-node deployments.
+
+    Each file is ``root/<last 2 hex digits>/<id>`` with its metadata in a
+    ``<id>.json`` sidecar. Writes go to a temporary file and are renamed into
+    place, so readers never see a partial file.
+    """
+
+    name = "local"
+    zero_copy = True
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, file_id: ObjectId) -> str:
+        file_id = str(file_id)
+        return os.path.join(self.root, file_id[-2:], file_id)
+
+    def _write(self, file_id: ObjectId, data: bytes, info: Dict[str, Any]):
+        path = self.path(file_id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        for target, payload in ((path, data), (f"{path}.json", json.dumps(info).encode())):
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(temp_path, target)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def _read_info(self, file_id: ObjectId) -> Dict[str, Any]:
+        with open(f"{self.path(file_id)}.json", "rb") as f:
+            return json.load(f)
+
+    def _remove(self, file_id: ObjectId):
+        path = self.path(file_id)
+        # Sidecar first: once it is gone the file no longer exists for readers
+        for target in (f"{path}.json", path):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+    async def put(self, data: bytes, filename: str, content_type: str, metadata: Optional[Dict[str, Any]] = None, file_id: Optional[ObjectId] = None) -> ObjectId:
+        file_id = file_id or ObjectId()
+        info = {
+            "_id": str(file_id),
+            "filename": filename,
+            "content_type": content_type,
+            "length": len(data),
+            "metadata": metadata,
+            "upload_date": datetime.utcnow().isoformat()
+        }
+        await asyncio.to_thread(self._write, file_id, data, info)
+        return file_id
+
+    async def open(self, file_id: ObjectId) -> LocalFile:
+        info = await asyncio.to_thread(self._read_info, file_id)
+        return LocalFile(self.path(file_id), info)
+
+    async def delete(self, file_id: ObjectId):
+        await asyncio.to_thread(self._remove, file_id)
+
+    async def exists(self, file_id: ObjectId) -> bool:
+        return await asyncio.to_thread(os.path.exists, f"{self.path(file_id)}.json")
+
+    async def iter_ids(self) -> AsyncIterator[ObjectId]:
+        entries = await asyncio.to_thread(_list_sidecars, self.root)
+        for name in entries:
+            yield ObjectId(name[:-len(".json")])
+
+
+def _list_sidecars(root: str) -> list:
+    if not os.path.isdir(root):
+        return []
+    return [
+        name
+        for directory in sorted(os.listdir(root)) if os.path.isdir(os.path.join(root, directory))
+        for name in sorted(os.listdir(os.path.join(root, directory))) if name.endswith(".json")
+    ]
+
+
+_stores: Dict[str, BlobStore] = {}
+
+
+def get_blob_store(name: Optional[str] = None) -> BlobStore:
+    """The blob store called ``name``, or the one ``STORAGE_BACKEND`` selects (default "gridfs")."""
+    name = (name or os.getenv("STORAGE_BACKEND", "gridfs")).lower()
+    if name not in _stores:
+        if name == "gridfs":
+            _stores[name] = GridFSStore()
+        elif name == "local":
+            _stores[name] = LocalFileStore(os.getenv("LOCAL_STORAGE_DIR", "theme_files"))
+        else:
+            raise ValueError(f"Unknown storage backend {name!r}; expected 'gridfs' or 'local'")
+    return _stores[name]
+
+
+async def migrate_blobs(source: str, target: str, delete_source: bool = False) -> Dict[str, int]:
+    """Copy every file from one blob store to another, keeping IDs and metadata.
+
+    Files already present in ``target`` are skipped, so an interrupted run can
+    be resumed. Files are copied one at a time. Returns copied/skipped/failed
+    counts.
+    """
+    source_store, target_store = get_blob_store(source), get_blob_store(target)
+    if source_store is target_store:
+        raise ValueError("Source and target storage backends are the same")
+    counts = {"copied": 0, "skipped": 0, "failed": 0}
+    async for file_id in source_store.iter_ids():
+        try:
+            if await target_store.exists(file_id):
+                counts["skipped"] += 1
+            else:
+                file_obj = await source_store.open(file_id)
+                try:
+                    data = await file_obj.read()
+                finally:
+                    await file_obj.close()
+                await target_store.put(data, file_obj.filename, file_obj.content_type, file_obj.metadata, file_id=file_id)
+                counts["copied"] += 1
+            if delete_source:
+                await source_store.delete(file_id)
+        except Exception as e:
+            logger.error(f"Could not migrate file {file_id} from {source} to {target}: {e}")
+            counts["failed"] += 1
+    return counts
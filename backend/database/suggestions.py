@@ -0,0 +1,295 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import logging
+import os
+from .connection import get_database
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_KINDS = ("theme", "tag", "author")
+
+# Most suggestions one lookup may ask for
+TOP_K = 25
+# Entries a prefix node keeps per kind; the slack over TOP_K absorbs entries
+# that drop out before the node has to be recomputed
+NODE_CAPACITY = 2 * TOP_K
+# Prefixes matching at most this many keys are ranked by scanning them;
+# broader ones get a node with a maintained top list
+SCAN_LIMIT = 256
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _prefix_keys(text: str) -> Set[str]:
+    """Keys under which ``text`` is found: the text from the start of each word."""
+    words = _normalize(text).split(" ")
+    return {" ".join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class _Entry:
+    __slots__ = ("kind", "value", "theme_id", "downloads", "themes", "keys")
+
+    def __init__(self, kind: str, value: str, theme_id: Optional[int] = None):
+        self.kind = kind
+        self.value = value
+        self.theme_id = theme_id
+        self.downloads = 0
+        self.themes = 0
+        self.keys = _prefix_keys(value)
+
+    def rank(self) -> Tuple[int, int]:
+        return self.downloads, self.themes
+
+
+class _Node:
+    """Best entries of one kind under one prefix, most popular first.
+
+    Any entry not listed ranks no higher than the last listed one.
+    ``truncated`` means some entries are not listed; ``dirty`` means fewer
+    than ``TOP_K`` are left while others exist, so the list must be
+    recomputed from the key range.
+    """
+    __slots__ = ("top", "truncated", "dirty")
+
+    def __init__(self, entries: List["_Entry"]):
+        self.top = heapq.nlargest(NODE_CAPACITY, entries, key=_Entry.rank)
+        self.truncated = len(entries) > NODE_CAPACITY
+        self.dirty = False
+
+
+class SuggestionIndex:
+    """In-memory prefix index over theme names, tags and author names.
+
+    Keys live in one sorted list searched with ``bisect``; every word start
+    of a value is a key, so "mar" finds "Super Mario". Matches are ranked by
+    downloads, then by how many themes share the tag or author. Narrow
+    prefixes are ranked by scanning their keys. A broad prefix gets a node
+    per kind on its first lookup, holding its best ``NODE_CAPACITY``
+    entries; adds, removals and downloads update existing nodes in place,
+    so later lookups only merge a few short lists.
+
+    Each worker process keeps its own copy: ``build`` loads the catalog, the
+    theme write paths keep it current and ``start`` refreshes it periodically
+    to pick up writes made by other workers.
+    """
+
+    def __init__(self, refresh_interval: float = 600.0):
+        self.refresh_interval = refresh_interval
+        self._keys: List[Tuple[str, str, str]] = []
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._themes: Dict[int, Tuple[str, str, Tuple[str, ...], int]] = {}
+        self._nodes: Dict[str, Dict[str, _Node]] = {}
+        self._sorted = True
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry_nodes(self, entry: _Entry) -> Iterator[_Node]:
+        """The existing nodes an entry belongs to."""
+        if not self._nodes:
+            return
+        seen = set()
+        for key in entry.keys:
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix in seen:
+                    continue
+                seen.add(prefix)
+                node = self._nodes.get(prefix, {}).get(entry.kind)
+                if node is not None:
+                    yield node
+
+    def _promote(self, entry: _Entry):
+        """Update the nodes of an entry that is new or whose rank went up."""
+        rank = entry.rank()
+        for node in self._entry_nodes(entry):
+            if entry not in node.top:
+                if node.truncated and not (node.top and rank > node.top[-1].rank()):
+                    continue
+                node.top.append(entry)
+            node.top.sort(key=_Entry.rank, reverse=True)
+            if len(node.top) > NODE_CAPACITY:
+                node.top.pop()
+                node.truncated = True
+
+    def _demote(self, entry: _Entry, removed: bool):
+        """Update the nodes of an entry whose rank went down or that is gone."""
+        for node in self._entry_nodes(entry):
+            if entry not in node.top:
+                continue
+            node.top.sort(key=_Entry.rank, reverse=True)
+            # An unlisted entry may now outrank it, unless something listed still ranks lower
+            if removed or (node.truncated and node.top[-1] is entry):
+                node.top.remove(entry)
+            if node.truncated and len(node.top) < TOP_K:
+                node.dirty = True
+
+    def _key_range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self._keys, (prefix,)), bisect_left(self._keys, (prefix + "\U0010ffff",))
+
+    def _scan(self, prefix: str) -> Dict[str, List[_Entry]]:
+        """Every entry with a key starting with ``prefix``, by kind."""
+        matches: Dict[str, Dict[str, _Entry]] = {kind: {} for kind in SUGGESTION_KINDS}
+        start, end = self._key_range(prefix)
+        for key, kind, entry_key in self._keys[start:end]:
+            matches[kind][entry_key] = self._entries[(kind, entry_key)]
+        return {kind: list(entries.values()) for kind, entries in matches.items()}
+
+    def _node(self, prefix: str) -> Optional[Dict[str, _Node]]:
+        """Nodes of a broad prefix, created or recomputed as needed; None for narrow ones."""
+        nodes = self._nodes.get(prefix)
+        if nodes is None:
+            start, end = self._key_range(prefix)
+            if end - start <= SCAN_LIMIT:
+                return None
+        elif not any(node.dirty for node in nodes.values()):
+            return nodes
+        nodes = self._nodes[prefix] = {kind: _Node(entries) for kind, entries in self._scan(prefix).items()}
+        return nodes
+
+    def _acquire(self, kind: str, value: str, theme_id: Optional[int] = None) -> _Entry:
+        entry_id = (kind, str(theme_id) if kind == "theme" else value)
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            entry = self._entries[entry_id] = _Entry(kind, value, theme_id)
+            for key in entry.keys:
+                if self._sorted:
+                    insort(self._keys, (key, *entry_id))
+                else:
+                    self._keys.append((key, *entry_id))
+        return entry
+
+    def _release(self, kind: str, value: str, theme_id: Optional[int], downloads: int):
+        entry_id = (kind, str(theme_id) if kind == "theme" else value)
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        entry.downloads -= downloads
+        entry.themes -= 1
+        if entry.themes <= 0:
+            del self._entries[entry_id]
+            for key in entry.keys:
+                position = bisect_left(self._keys, (key, *entry_id))
+                if position < len(self._keys) and self._keys[position] == (key, *entry_id):
+                    del self._keys[position]
+        self._demote(entry, removed=entry.themes <= 0)
+
+    def _parts(self, theme_id: int, name: str, author_name: str, tags: Iterable[str]):
+        yield "theme", name, theme_id
+        yield "author", author_name, None
+        for tag in tags:
+            yield "tag", tag, None
+
+    def add_theme(self, theme_id: int, name: str, author_name: str, tags: Iterable[str] = (), downloads: int = 0):
+        """Index a theme, replacing what was indexed for it before."""
+        self.remove_theme(theme_id)
+        tags = tuple(sorted(set(tag for tag in tags if tag)))
+        self._themes[theme_id] = (name, author_name, tags, downloads)
+        for kind, value, entry_theme_id in self._parts(theme_id, name, author_name, tags):
+            if value:
+                entry = self._acquire(kind, value, entry_theme_id)
+                entry.downloads += downloads
+                entry.themes += 1
+                self._promote(entry)
+
+    def remove_theme(self, theme_id: int):
+        indexed = self._themes.pop(theme_id, None)
+        if indexed is None:
+            return
+        name, author_name, tags, downloads = indexed
+        for kind, value, entry_theme_id in self._parts(theme_id, name, author_name, tags):
+            if value:
+                self._release(kind, value, entry_theme_id, downloads)
+
+    def record_downloads(self, theme_id: int, count: int = 1):
+        """Raise the ranking of a theme and its author and tags."""
+        indexed = self._themes.get(theme_id)
+        if indexed is None:
+            return
+        name, author_name, tags, downloads = indexed
+        self._themes[theme_id] = (name, author_name, tags, downloads + count)
+        for kind, value, entry_theme_id in self._parts(theme_id, name, author_name, tags):
+            entry = self._entries.get((kind, str(entry_theme_id) if kind == "theme" else value))
+            if entry is not None:
+                entry.downloads += count
+                self._promote(entry)
+
+    def suggest(self, prefix: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Most popular names, tags and authors with a word starting with ``prefix``."""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        wanted = set(kinds or SUGGESTION_KINDS)
+        nodes = self._node(prefix) if limit <= TOP_K else None
+        if nodes is not None:
+            candidates = [entry for kind in wanted for entry in nodes[kind].top[:limit]]
+        else:
+            candidates = [entry for kind, entries in self._scan(prefix).items() if kind in wanted for entry in entries]
+        best = heapq.nlargest(limit, candidates, key=_Entry.rank)
+        return [
+            {"kind": entry.kind, "value": entry.value, "theme_id": entry.theme_id, "downloads": entry.downloads}
+            for entry in best
+        ]
+
+    def replace(self, themes: Iterable[Dict[str, Any]]):
+        """Rebuild the index from theme documents."""
+        rebuilt = SuggestionIndex(self.refresh_interval)
+        # Append keys unordered and sort once at the end
+        rebuilt._sorted = False
+        for theme in themes:
+            rebuilt.add_theme(
+                theme["theme_id"], theme.get("name", ""), theme.get("author_name", ""),
+                theme.get("tags") or [], theme.get("download_count", 0)
+            )
+        rebuilt._keys.sort()
+        rebuilt._sorted = True
+        # Create nodes for the broadest prefixes and the ones lookups have needed so far,
+        # so no lookup pays for a full scan
+        short_prefixes = {key[:length] for key, _, _ in rebuilt._keys for length in (1, 2)}
+        for prefix in short_prefixes | set(self._nodes):
+            rebuilt._node(prefix)
+        self._keys, self._entries, self._themes = rebuilt._keys, rebuilt._entries, rebuilt._themes
+        self._nodes = rebuilt._nodes
+
+    async def build(self) -> int:
+        """Load every theme from the database; returns the number indexed."""
+        try:
+            projection = {"_id": 0, "theme_id": 1, "name": 1, "author_name": 1, "tags": 1, "download_count": 1}
+            themes = await get_database().themes.find({"theme_id": {"$exists": True}}, projection).to_list()
+            self.replace(themes)
+            return len(themes)
+        except Exception as e:
+            logger.error(f"Error building suggestion index: {e}")
+            raise
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.build()
+            except Exception as e:
+                logger.error(f"Suggestion index refresh error: {e}")
+
+    def start(self):
+        """Start the periodic rebuild loop on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+suggestion_index = SuggestionIndex(
+    refresh_interval=float(os.getenv("SUGGEST_REFRESH_INTERVAL", "600")),
+)
@@ -0,0 +1,64 @@
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+from pymongo import UpdateOne
+from .connection import get_database
+
+logger = logging.getLogger(__name__)
+
+
+async def apply_tag_changes(old_tags: Iterable[str], new_tags: Iterable[str]):
+    """Adjust ``tag_stats`` counts for one theme whose tags went from old to new.
+
+    A theme counts once per distinct tag. Failures are logged rather than
+    raised so they never fail the theme write; ``rebuild_tag_stats`` repairs
+    any drift.
+    """
+    old, new = set(old_tags or []), set(new_tags or [])
+    operations = [
+        UpdateOne({"_id": tag}, {"$inc": {"count": 1}}, upsert=True) for tag in new - old
+    ] + [
+        UpdateOne({"_id": tag}, {"$inc": {"count": -1}}) for tag in old - new
+    ]
+    if not operations:
+        return
+    try:
+        db = get_database()
+        await db.tag_stats.bulk_write(operations, ordered=False)
+        if old - new:
+            await db.tag_stats.delete_many({"_id": {"$in": list(old - new)}, "count": {"$lte": 0}})
+    except Exception as e:
+        logger.error(f"Error updating tag stats: {e}")
+
+
+async def get_tag_stats(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get ``{"tag", "count"}`` pairs, most used first."""
+    try:
+        db = get_database()
+        cursor = db.tag_stats.find({}, {"count": 1}).sort([("count", -1), ("_id", 1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return [{"tag": stat["_id"], "count": stat["count"]} for stat in await cursor.to_list()]
+    except Exception as e:
+        logger.error(f"Error getting tag stats: {e}")
+        raise
+
+
+async def rebuild_tag_stats() -> int:
+    """Recompute ``tag_stats`` from the themes collection, replacing it atomically.
+
+    Returns the number of distinct tags.
+    """
+    try:
+        db = get_database()
+        pipeline = [
+            {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+            {"$out": "tag_stats"}
+        ]
+        cursor = await db.themes.aggregate(pipeline)
+        await cursor.to_list()
+        return await db.tag_stats.count_documents({})
+    except Exception as e:
+        logger.error(f"Error rebuilding tag stats: {e}")
+        raise
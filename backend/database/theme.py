@@ -1,21 +1,121 @@
 from bson import ObjectId
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple, Union
+import asyncio
+import io
 import logging
+import os
+import zipfile
 from datetime import datetime
-from .connection import get_database, get_fs
-from models.theme import ThemeCreate, ThemeUpdate, ThemeResponse
+from .connection import get_database
+from .blobs import release_blob, store_blob
+from .cache import TTLCache, query_key
+from .counters import SequenceAllocator
+from .file_cache import CachedFile, theme_file_cache
+from .storage import get_blob_store
+from .theme_zip import ThemeZip, release_theme_zip, store_theme_zip
+from .images import delete_theme_images, store_theme_image
+from .suggestions import suggestion_index
+from .tags import apply_tag_changes, get_tag_stats
+from .trending import TRENDING_WINDOWS, decayed_score, download_increment, trending_field
+from models.theme import ThemeCreate, ThemeUpdate, ThemeResponse, ThemeSummary, TrendingTheme
+from utils.pagination import InvalidCursor, encode_cursor, keyset_filter, keyset_sort
+from utils.zip_builder import END_RECORD, parse_end_record, uncompressed_total
 
 logger = logging.getLogger(__name__)
 
-
-def create_theme(theme_data: ThemeCreate, user_id: str, zip_file_id: str, extra_fields: dict = None) -> ThemeResponse:
-    """Create a new theme with ZIP file reference and extra fields."""
+# Filtered listing totals, keyed by normalized query; cleared on every catalog write
+theme_count_cache = TTLCache(
+    maxsize=512,
+    ttl=float(os.getenv("THEME_COUNT_CACHE_TTL", "30")),
+    name="theme_counts"
+)
+
+# Top themes per trending window ("all" = lifetime downloads), refreshed on expiry
+LEADERBOARD_SIZE = 100
+leaderboard_cache = TTLCache(
+    maxsize=len(TRENDING_WINDOWS) + 1,
+    ttl=float(os.getenv("TRENDING_CACHE_TTL", "60")),
+    name="trending_leaderboards"
+)
+
+# Theme documents by integer theme_id, and whole listing results by their arguments
+theme_cache = TTLCache(
+    maxsize=int(os.getenv("THEME_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("THEME_CACHE_TTL", "30")),
+    name="themes"
+)
+theme_list_cache = TTLCache(
+    maxsize=256,
+    ttl=float(os.getenv("THEME_LIST_CACHE_TTL", "10")),
+    name="theme_lists"
+)
+
+# ZIP manifests by integer theme_id; they never change, so only deletes invalidate them
+theme_zip_cache = TTLCache(
+    maxsize=int(os.getenv("THEME_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("THEME_ZIP_CACHE_TTL", "600")),
+    name="theme_zips"
+)
+
+
+def invalidate_theme_caches(theme_id: Optional[int] = None):
+    """Drop cached data a catalog write may have changed.
+
+    ``theme_id`` selects the cached document to drop; listings, counts and
+    leaderboards are cleared in any case.
+    """
+    if theme_id is not None:
+        theme_cache.invalidate(theme_id)
+    theme_list_cache.clear()
+    theme_count_cache.clear()
+    leaderboard_cache.clear()
+
+
+def get_cache_stats() -> List[Dict[str, Any]]:
+    """Hit/miss/eviction statistics for the theme caches of this worker."""
+    caches = (theme_cache, theme_list_cache, theme_count_cache, leaderboard_cache, theme_zip_cache, theme_file_cache)
+    return [cache.stats() for cache in caches]
+
+
+# Images used to be embedded as base64; never load them with theme documents,
+# nor the ZIP manifest, which downloads read separately
+THEME_DOCUMENT_PROJECTION = {"preview_b64": 0, "icon_b64": 0, "zip": 0}
+
+# Fields a listing card needs; keeps descriptions and embedded images out of list queries
+THEME_SUMMARY_PROJECTION = {
+    field: 1 for field in (
+        "theme_id", "name", "author_name", "short_description", "tags",
+        "user_id", "download_count", "created_at", "updated_at"
+    )
+}
+
+
+async def _get_max_theme_id() -> int:
+    """Highest theme_id currently stored, used to seed the counter once."""
+    db = get_database()
+    last_theme = await db.themes.find_one({}, {"theme_id": 1}, sort=[("theme_id", -1)])
+    return last_theme["theme_id"] if last_theme else 0
+
+
+# Per-worker theme_id allocator; THEME_ID_BLOCK_SIZE > 1 reserves IDs in blocks
+theme_id_allocator = SequenceAllocator(
+    "theme_id",
+    block_size=int(os.getenv("THEME_ID_BLOCK_SIZE", "1")),
+    seed=_get_max_theme_id,
+)
+
+
+async def create_theme(theme_data: ThemeCreate, user_id: str, zip_file_id: Optional[str] = None, extra_fields: dict = None, images: Optional[Dict[str, bytes]] = None, zip_manifest: Optional[Dict[str, Any]] = None) -> ThemeResponse:
+    """Create a new theme with its ZIP and extra fields.
+
+    The ZIP is either ``zip_manifest`` from ``store_theme_zip`` or, for a ZIP
+    stored whole, ``zip_file_id``. ``images`` maps an image kind ("preview",
+    "icon") to PNG bytes, stored in ``theme_images`` under the new theme_id.
+    """
     try:
         db = get_database()
         themes_collection = db.themes
-        # Assign incrementing theme_id
-        last_theme = themes_collection.find_one(sort=[('theme_id', -1)])
-        next_theme_id = 1 if not last_theme else last_theme['theme_id'] + 1
+        next_theme_id = await theme_id_allocator.next()
         
         theme_doc = {
             "theme_id": next_theme_id,
@@ -32,80 +132,250 @@ def create_theme(theme_data: ThemeCreate, user_id: str, zip_file_id: str, extra_
         }
         if extra_fields:
             theme_doc.update(extra_fields)
-        result = themes_collection.insert_one(theme_doc)
+        if zip_manifest is not None:
+            theme_doc["zip"] = zip_manifest
+        result = await themes_collection.insert_one(theme_doc)
+        for kind, data in (images or {}).items():
+            await store_theme_image(next_theme_id, kind, data)
+        await apply_tag_changes([], theme_doc["tags"])
+        invalidate_theme_caches()
+        suggestion_index.add_theme(next_theme_id, theme_doc["name"], theme_doc["author_name"], theme_doc["tags"])
         theme_doc["_id"] = str(result.inserted_id)
+        theme_doc.pop("zip", None)
         return ThemeResponse(**theme_doc)
     except Exception as e:
         logger.error(f"Error creating theme: {e}")
         raise
 
 
-def get_theme_by_id(theme_id: ObjectId) -> Optional[ThemeResponse]:
+async def get_theme_by_id(theme_id: ObjectId) -> Optional[ThemeResponse]:
     """Get theme by ID."""
     try:
         db = get_database()
         themes_collection = db.themes
-        theme_doc = themes_collection.find_one({"_id": theme_id})
+        theme_doc = await themes_collection.find_one({"_id": theme_id}, THEME_DOCUMENT_PROJECTION)
         if theme_doc:
             theme_doc["_id"] = str(theme_doc["_id"])
-            return ThemeResponse(**theme_doc)
+            return ThemeResponse.from_document(theme_doc)
         return None
     except Exception as e:
         logger.error(f"Error getting theme by ID: {e}")
         raise
 
 
-def get_themes(skip: int = 0, limit: int = 10, search: Optional[str] = None, tags: Optional[List[str]] = None, author: Optional[str] = None) -> Dict[str, Any]:
-    """Get themes with pagination and filtering."""
+def build_theme_query(search: Optional[str] = None, tags: Optional[List[str]] = None, author: Optional[str] = None) -> Dict[str, Any]:
+    """Build the themes filter shared by the listing endpoints."""
+    query = {}
+    if search:
+        # Served by the weighted "theme_search" text index
+        query["$text"] = {"$search": search}
+    if tags:
+        query["tags"] = {"$in": sorted(set(tags))}
+    if author:
+        query["author_name"] = {"$regex": author, "$options": "i"}
+    return query
+
+
+async def count_themes(query: Dict[str, Any]) -> Tuple[int, bool]:
+    """Count themes matching ``query``, returning ``(total, exact)``.
+
+    The unfiltered total comes from collection metadata and filtered totals
+    may come from ``theme_count_cache``; ``exact`` is True only when
+    ``count_documents`` ran for this call.
+    """
+    themes_collection = get_database().themes
+    if not query:
+        return await themes_collection.estimated_document_count(), False
+    key = query_key(query)
+    total = theme_count_cache.get(key)
+    if total is not None:
+        return total, False
+    total = await themes_collection.count_documents(query)
+    theme_count_cache.set(key, total)
+    return total, True
+
+
+async def get_themes(
+    skip: int = 0,
+    limit: int = 10,
+    search: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    author: Optional[str] = None,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    include_total: bool = True
+) -> Dict[str, Any]:
+    """Get themes with pagination and filtering.
+
+    ``search`` is a full-text query (stemmed, ``"exact phrase"`` and ``-word``
+    supported); matches are ordered by relevance, everything else by ``sort``.
+
+    Passing ``cursor`` (``""`` for the first page) switches to keyset pagination
+    on ``(sort key, _id)``: ``skip`` is ignored and ``next_cursor`` points at the
+    following page, so every page costs the same. Relevance-ordered search
+    results can only be paged by offset.
+    """
+    cache_key = query_key({
+        "skip": skip, "limit": limit, "search": search, "tags": sorted(set(tags or [])),
+        "author": author, "sort": sort, "cursor": cursor, "include_total": include_total
+    })
+    cached = theme_list_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
         db = get_database()
         themes_collection = db.themes
-        query = {}
-        
+        query = build_theme_query(search, tags, author)
+
+        total, exact = await count_themes(query) if include_total else (None, None)
+        next_cursor = None
         if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"author_name": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}},
-                {"tags": {"$in": [search]}}
-            ]
-        
-        if tags:
-            query["tags"] = {"$in": tags}
-        
-        if author:
-            query["author_name"] = {"$regex": author, "$options": "i"}
-        
-        total = themes_collection.count_documents(query)
-        themes = list(themes_collection.find(query).skip(skip).limit(limit).sort("created_at", -1))
+            if cursor is not None:
+                raise InvalidCursor("Cursor pagination is not available for search results")
+            find_cursor = themes_collection.find(query, {**THEME_SUMMARY_PROJECTION, "score": {"$meta": "textScore"}}).sort(
+                [("score", {"$meta": "textScore"}), ("created_at", -1)]
+            )
+            themes = await find_cursor.skip(skip).limit(limit).to_list()
+        elif cursor is not None:
+            if cursor:
+                after = keyset_filter(sort, cursor)
+                query = {"$and": [query, after]} if query else after
+            # Fetch one extra document to learn whether another page exists
+            themes = await themes_collection.find(query, THEME_SUMMARY_PROJECTION).sort(keyset_sort(sort)).limit(limit + 1).to_list()
+            if len(themes) > limit:
+                themes = themes[:limit]
+                next_cursor = encode_cursor(sort, themes[-1])
+        else:
+            themes = await themes_collection.find(query, THEME_SUMMARY_PROJECTION).sort(keyset_sort(sort)).skip(skip).limit(limit).to_list()
+
         for theme in themes:
             theme["_id"] = str(theme["_id"])
-        return {
-            "themes": [ThemeResponse(**theme) for theme in themes],
+            theme.pop("score", None)
+        result = {
+            "themes": [ThemeSummary.from_document(theme) for theme in themes],
             "total": total,
-            "page": skip // limit + 1,
-            "limit": limit
+            "exact": exact,
+            "page": skip // limit + 1 if cursor is None else None,
+            "limit": limit,
+            "next_cursor": next_cursor
         }
+        theme_list_cache.set(cache_key, result)
+        return result
+    except InvalidCursor:
+        raise
     except Exception as e:
         logger.error(f"Error getting themes: {e}")
         raise
 
 
-def get_themes_by_user(user_id: str) -> List[ThemeResponse]:
-    """Get all themes by a specific user."""
+async def search_themes(
+    skip: int = 0,
+    limit: int = 10,
+    search: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    author: Optional[str] = None,
+    sort: str = "newest",
+    facet_limit: int = 20
+) -> Dict[str, Any]:
+    """Get a page of themes, the total and tag/author facet counts in one aggregation.
+
+    Takes the same filters as ``get_themes``. Facets count the themes matching
+    the whole filter (each theme once per distinct tag), most common first,
+    up to ``facet_limit`` values each.
+    """
+    cache_key = query_key({
+        "facets": facet_limit, "skip": skip, "limit": limit, "search": search,
+        "tags": sorted(set(tags or [])), "author": author, "sort": sort
+    })
+    cached = theme_list_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        db = get_database()
+        query = build_theme_query(search, tags, author)
+        projection = dict(THEME_SUMMARY_PROJECTION)
+        if search:
+            projection["score"] = {"$meta": "textScore"}
+            page_sort = {"score": -1, "created_at": -1, "_id": -1}
+        else:
+            page_sort = dict(keyset_sort(sort))
+
+        def facet(group_key: str) -> List[Dict[str, Any]]:
+            return [
+                {"$group": {"_id": group_key, "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": facet_limit}
+            ]
+
+        pipeline = [
+            {"$match": query},
+            {"$project": projection},
+            {"$facet": {
+                "themes": [{"$sort": page_sort}, {"$skip": skip}, {"$limit": limit}],
+                "total": [{"$count": "count"}],
+                "tags": [
+                    {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}}},
+                    {"$unwind": "$tags"},
+                    *facet("$tags")
+                ],
+                "authors": facet("$author_name")
+            }}
+        ]
+        cursor = await db.themes.aggregate(pipeline)
+        facets = (await cursor.to_list())[0]
+
+        for theme in facets["themes"]:
+            theme["_id"] = str(theme["_id"])
+            theme.pop("score", None)
+        result = {
+            "themes": [ThemeSummary.from_document(theme) for theme in facets["themes"]],
+            "total": facets["total"][0]["count"] if facets["total"] else 0,
+            "page": skip // limit + 1,
+            "limit": limit,
+            "tags": [{"value": tag["_id"], "count": tag["count"]} for tag in facets["tags"]],
+            "authors": [{"value": name["_id"], "count": name["count"]} for name in facets["authors"]]
+        }
+        theme_list_cache.set(cache_key, result)
+        return result
+    except Exception as e:
+        logger.error(f"Error searching themes: {e}")
+        raise
+
+
+async def get_themes_by_user(user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Get one page of a user's themes, newest first.
+
+    Pages with a keyset ``cursor`` (``next_cursor`` of the previous page)
+    over the ``user_id_created_at_id`` index, so deep pages cost the same as
+    the first.
+    """
     try:
         db = get_database()
         themes_collection = db.themes
-        themes = list(themes_collection.find({"user_id": user_id}).sort("created_at", -1))
+        query: Dict[str, Any] = {"user_id": user_id}
+        if cursor:
+            query.update(keyset_filter("newest", cursor))
+        # Fetch one extra document to learn whether another page exists
+        themes = await themes_collection.find(query, THEME_SUMMARY_PROJECTION).sort(keyset_sort("newest")).limit(limit + 1).to_list()
+        next_cursor = None
+        if len(themes) > limit:
+            themes = themes[:limit]
+            next_cursor = encode_cursor("newest", themes[-1])
         for theme in themes:
             theme["_id"] = str(theme["_id"])
-        return [ThemeResponse(**theme) for theme in themes]
+        return {
+            "themes": [ThemeSummary.from_document(theme) for theme in themes],
+            "limit": limit,
+            "next_cursor": next_cursor
+        }
+    except InvalidCursor:
+        raise
     except Exception as e:
         logger.error(f"Error getting themes by user: {e}")
         raise
 
 
-def update_theme(theme_id: ObjectId, theme_data: ThemeUpdate) -> Optional[ThemeResponse]:
+async def update_theme(theme_id: ObjectId, theme_data: ThemeUpdate) -> Optional[ThemeResponse]:
     """Update theme information."""
     try:
         db = get_database()
@@ -113,97 +383,291 @@ def update_theme(theme_id: ObjectId, theme_data: ThemeUpdate) -> Optional[ThemeR
         update_data = {k: v for k, v in theme_data.dict(exclude_unset=True).items()}
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
-            result = themes_collection.update_one(
+            # Read the previous tags in the same round trip to keep tag_stats in step
+            previous = await themes_collection.find_one_and_update(
                 {"_id": theme_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                projection={"tags": 1, "theme_id": 1}
             )
-            if result.modified_count > 0:
-                return get_theme_by_id(theme_id)
+            if previous is not None:
+                if "tags" in update_data:
+                    await apply_tag_changes(previous.get("tags", []), update_data["tags"])
+                invalidate_theme_caches(previous.get("theme_id"))
+                updated = await get_theme_by_id(theme_id)
+                if updated is not None and updated.theme_id is not None:
+                    suggestion_index.add_theme(updated.theme_id, updated.name, updated.author_name, updated.tags, updated.download_count)
+                return updated
         return None
     except Exception as e:
         logger.error(f"Error updating theme: {e}")
         raise
 
 
-def delete_theme(theme_id: ObjectId) -> bool:
-    """Delete theme and ZIP file."""
+async def delete_theme(theme_id: ObjectId) -> bool:
+    """Delete theme, its images and its ZIP files unless other themes share them."""
     try:
         db = get_database()
         themes_collection = db.themes
-        fs = get_fs(db)
-        # Get theme to find ZIP file ID
-        theme = get_theme_by_id(theme_id)
+        # Get theme to find its ZIP
+        theme = await get_theme_by_id(theme_id)
         if not theme:
             return False
-        # Delete ZIP file from GridFS
+        # Release the ZIP's files; each is only deleted once no other theme shares it
         try:
-            fs.delete(ObjectId(theme.zip_file_id))
+            if theme.zip_file_id:
+                await delete_file(ObjectId(theme.zip_file_id))
+            else:
+                manifest = await get_theme_zip(theme.theme_id)
+                if manifest is not None:
+                    for file_id in await release_theme_zip(manifest):
+                        await theme_file_cache.invalidate(str(file_id))
         except Exception as e:
-            logger.warning(f"Could not delete ZIP file {theme.zip_file_id}: {e}")
-        # Delete theme document
-        result = themes_collection.delete_one({"_id": theme_id})
+            logger.warning(f"Could not delete ZIP of theme {theme.theme_id}: {e}")
+        theme_zip_cache.invalidate(theme.theme_id)
+        # Delete theme document, then its images
+        result = await themes_collection.delete_one({"_id": theme_id})
+        await delete_theme_images(theme.theme_id)
+        if result.deleted_count > 0:
+            await apply_tag_changes(theme.tags, [])
+            suggestion_index.remove_theme(theme.theme_id)
+        invalidate_theme_caches(theme.theme_id)
         return result.deleted_count > 0
     except Exception as e:
         logger.error(f"Error deleting theme: {e}")
         raise
 
 
-def increment_download_count(theme_id: ObjectId) -> bool:
-    """Increment download count for a theme."""
+async def increment_download_count(theme_id: ObjectId, count: int = 1) -> bool:
+    """Increment download count and trending scores for a theme.
+
+    Downloads normally go through ``download_counter``, which batches these
+    writes; this is the direct, unbuffered path.
+    """
     try:
         db = get_database()
         themes_collection = db.themes
-        result = themes_collection.update_one(
+        updated = await themes_collection.find_one_and_update(
             {"_id": theme_id},
-            {"$inc": {"download_count": 1}}
+            download_increment(count, datetime.utcnow()),
+            projection={"theme_id": 1}
         )
-        return result.modified_count > 0
+        if updated is None:
+            return False
+        theme_cache.invalidate(updated.get("theme_id"))
+        suggestion_index.record_downloads(updated.get("theme_id"), count)
+        return True
     except Exception as e:
         logger.error(f"Error incrementing download count: {e}")
         raise
 
 
-def store_file(file_data: bytes, filename: str, content_type: str = "application/octet-stream") -> ObjectId:
-    """Store a file in GridFS."""
+async def store_file(file_data: bytes, filename: str, content_type: str = "application/octet-stream") -> ObjectId:
+    """Store a file in the blob store, content-addressed by SHA-256.
+
+    Identical bytes are stored once; the returned file ID may already be
+    referenced by other themes. Release it with ``delete_file``.
+    """
     try:
-        db = get_database()
-        fs = get_fs(db)
-        file_id = fs.put(file_data, filename=filename, content_type=content_type)
-        return file_id
+        return await store_blob(file_data, filename, content_type)
     except Exception as e:
         logger.error(f"Error storing file {filename}: {e}")
         raise
 
 
-def get_file(file_id: ObjectId):
-    """Get a file from GridFS."""
+async def get_theme_zip(theme_id: int) -> Optional[Dict[str, Any]]:
+    """ZIP manifest of a theme stored by member, from ``theme_zip_cache`` when possible.
+
+    None for themes whose ZIP is stored whole (``zip_file_id``) and for
+    unknown themes.
+    """
+    manifest = theme_zip_cache.get(theme_id)
+    if manifest is None:
+        theme_doc = await get_database().themes.find_one({"theme_id": theme_id}, {"zip": 1})
+        manifest = theme_doc.get("zip") if theme_doc else None
+        if manifest is not None:
+            theme_zip_cache.set(theme_id, manifest)
+    return manifest
+
+
+async def open_theme_zip(theme: ThemeResponse):
+    """Open a theme's ZIP for reading.
+
+    Themes stored by member get a ``ThemeZip`` assembled from their manifest,
+    with hot members served from ``theme_file_cache``; ZIPs stored whole are
+    opened with ``open_theme_file``. Raises ``FileNotFoundError`` if the
+    theme has no ZIP.
+    """
+    if theme.zip_file_id:
+        try:
+            return await open_theme_file(ObjectId(theme.zip_file_id))
+        except FileNotFoundError:
+            # Split into members by split_theme_zips since this theme was cached
+            pass
+    manifest = await get_theme_zip(theme.theme_id)
+    if manifest is None:
+        raise FileNotFoundError(f"Theme {theme.theme_id} has no ZIP")
+    return ThemeZip(manifest, open_theme_file)
+
+
+def _unpack_zip(data: bytes) -> List[Tuple[str, bytes]]:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return [(info.filename, archive.read(info)) for info in archive.infolist() if not info.is_dir()]
+
+
+async def split_theme_zips() -> Dict[str, int]:
+    """Move themes whose ZIP is stored whole to per-member storage.
+
+    Each ZIP is unpacked, its files stored with ``store_theme_zip`` and the
+    whole ZIP released. A theme is only switched if its ``zip_file_id`` is
+    unchanged, so an interrupted run can be repeated. The repacked ZIP holds
+    the same files but not the same bytes, so its ETag changes. Returns
+    split/failed counts.
+    """
+    db = get_database()
+    store = get_blob_store()
+    counts = {"split": 0, "failed": 0}
+    async for theme in db.themes.find({"zip_file_id": {"$ne": None}}, {"theme_id": 1, "zip_file_id": 1}):
+        try:
+            file_obj = await store.open(ObjectId(theme["zip_file_id"]))
+            try:
+                data = await file_obj.read()
+            finally:
+                await file_obj.close()
+            manifest, _ = await store_theme_zip(await asyncio.to_thread(_unpack_zip, data))
+            result = await db.themes.update_one(
+                {"_id": theme["_id"], "zip_file_id": theme["zip_file_id"]},
+                {"$set": {"zip": manifest, "zip_file_id": None}}
+            )
+            if result.modified_count == 0:
+                await release_theme_zip(manifest)
+                continue
+            await delete_file(ObjectId(theme["zip_file_id"]))
+            theme_cache.invalidate(theme.get("theme_id"))
+            counts["split"] += 1
+        except Exception as e:
+            logger.error(f"Could not split ZIP {theme['zip_file_id']} of theme {theme.get('theme_id')}: {e}")
+            counts["failed"] += 1
+    return counts
+
+
+async def get_file(file_id: ObjectId):
+    """Open a file from the configured blob store (an ``AsyncGridOut`` or ``LocalFile``)."""
     try:
-        db = get_database()
-        fs = get_fs(db)
-        return fs.get(file_id)
+        return await get_blob_store().open(file_id)
     except Exception as e:
         logger.error(f"Error getting file {file_id}: {e}")
         raise
 
 
-def delete_file(file_id: ObjectId) -> bool:
-    """Delete a file from GridFS."""
+async def open_theme_file(file_id: ObjectId):
+    """Open a theme ZIP, from ``theme_file_cache`` when it is hot.
+
+    Returns a ``CachedFile`` or a file opened by the blob store; all work with
+    ``iter_file_chunks``, ``iter_file_range`` and ``get_file_digest``. A file
+    that has become hot is read whole once and cached on the way out.
+    """
+    if get_blob_store().zero_copy:
+        # Local files are already served from the OS page cache
+        return await get_file(file_id)
+    key = str(file_id)
+    cached = await theme_file_cache.get(key)
+    if cached is not None:
+        return cached
+    file_obj = await get_file(file_id)
+    if not theme_file_cache.should_admit(key, file_obj.length):
+        return file_obj
     try:
-        db = get_database()
-        fs = get_fs(db)
-        fs.delete(file_id)
-        return True
+        data = await file_obj.read()
+    finally:
+        await file_obj.close()
+    cached = CachedFile(file_obj._id, data, file_obj.upload_date, file_obj.metadata, file_obj.md5)
+    await theme_file_cache.put(key, cached)
+    return CachedFile(file_obj._id, data, file_obj.upload_date, file_obj.metadata, file_obj.md5)
+
+
+async def iter_file_chunks(file_obj) -> AsyncIterator[bytes]:
+    """Yield an open stored file one chunk at a time, then close it.
+
+    Only the chunk being sent is held in memory. (Iterating ``AsyncGridOut``
+    directly splits on newlines, which is wrong for binary files.)
+    """
+    try:
+        while True:
+            chunk = await file_obj.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await file_obj.close()
+
+
+async def iter_file_range(file_obj, start: int, end: int, close: bool = True) -> AsyncIterator[bytes]:
+    """Yield bytes ``start`` to ``end`` (inclusive) of an open stored file.
+
+    Seeks straight to the chunk holding ``start``, so earlier chunks are never
+    read. ``close=False`` leaves the file open for further ranges.
+    """
+    try:
+        await file_obj.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file_obj.readchunk()
+            if not chunk:
+                break
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        if close:
+            await file_obj.close()
+
+
+async def get_zip_content_size(file_obj) -> int:
+    """Total uncompressed size of the files in an open theme ZIP.
+
+    Reads only the end record and central directory (theme ZIPs carry no
+    archive comment), then rewinds the file.
+    """
+    try:
+        await file_obj.seek(file_obj.length - END_RECORD.size)
+        entries, directory_size = parse_end_record(await file_obj.read(END_RECORD.size))
+        await file_obj.seek(file_obj.length - END_RECORD.size - directory_size)
+        return uncompressed_total(await file_obj.read(directory_size), entries)
+    finally:
+        await file_obj.seek(0)
+
+
+def get_file_digest(file_obj) -> str:
+    """Content digest of an open stored file, for use as an entity tag.
+
+    Prefers the SHA-256 recorded by ``store_file`` (or the ZIP manifest), then the legacy GridFS
+    ``md5``; files with neither fall back to their ObjectId, which is never
+    reused for other content.
+    """
+    metadata = file_obj.metadata or {}
+    return metadata.get("sha256") or file_obj.md5 or str(file_obj._id)
+
+
+async def delete_file(file_id: ObjectId) -> bool:
+    """Drop one reference to a stored file; the bytes go when the last reference does.
+
+    Returns True if the file itself was deleted.
+    """
+    try:
+        deleted = await release_blob(file_id)
+        if deleted:
+            await theme_file_cache.invalidate(str(file_id))
+        return deleted
     except Exception as e:
         logger.error(f"Error deleting file {file_id}: {e}")
         raise
 
 
-def get_file_info(file_id: ObjectId) -> Optional[Dict[str, Any]]:
-    """Get file information from GridFS."""
+async def get_file_info(file_id: ObjectId) -> Optional[Dict[str, Any]]:
+    """Get file information from the blob store."""
     try:
-        db = get_database()
-        fs = get_fs(db)
-        file_info = fs.get(file_id)
+        file_info = await get_blob_store().open(file_id)
+        await file_info.close()
         return {
             "filename": file_info.filename,
             "content_type": file_info.content_type,
@@ -215,67 +679,117 @@ def get_file_info(file_id: ObjectId) -> Optional[Dict[str, Any]]:
         return None
 
 
-def get_theme(theme_id: int) -> Optional[ThemeResponse]:
-    """Get theme by integer ID."""
+async def get_theme(theme_id: int) -> Optional[ThemeResponse]:
+    """Get theme by integer ID, served from ``theme_cache`` when possible."""
     try:
+        theme = theme_cache.get(theme_id)
+        if theme is not None:
+            return theme
         db = get_database()
         themes_collection = db.themes
-        theme_doc = themes_collection.find_one({"theme_id": theme_id})
+        theme_doc = await themes_collection.find_one({"theme_id": theme_id}, THEME_DOCUMENT_PROJECTION)
         if theme_doc:
             theme_doc["_id"] = str(theme_doc["_id"])
-            return ThemeResponse(**theme_doc)
+            theme = ThemeResponse.from_document(theme_doc)
+            theme_cache.set(theme_id, theme)
+            return theme
         return None
     except Exception as e:
         logger.error(f"Error getting theme by int ID: {e}")
         raise
 
 
+async def get_themes_batch(theme_ids: List[int], summary: bool = True) -> Tuple[List[Union[ThemeSummary, ThemeResponse]], List[int]]:
+    """Get many themes by integer ID with one ``$in`` query.
+
+    Returns the themes in the order requested (duplicates dropped) and the
+    IDs that were not found. ``summary`` selects the card-sized projection;
+    full documents are also served from and added to ``theme_cache``.
+    """
+    try:
+        ordered_ids = list(dict.fromkeys(theme_ids))
+        found: Dict[int, Union[ThemeSummary, ThemeResponse]] = {}
+        if not summary:
+            for theme_id in ordered_ids:
+                theme = theme_cache.get(theme_id)
+                if theme is not None:
+                    found[theme_id] = theme
+        wanted = [theme_id for theme_id in ordered_ids if theme_id not in found]
+        if wanted:
+            db = get_database()
+            projection = THEME_SUMMARY_PROJECTION if summary else THEME_DOCUMENT_PROJECTION
+            themes = await db.themes.find({"theme_id": {"$in": wanted}}, projection).to_list()
+            for theme_doc in themes:
+                theme_doc["_id"] = str(theme_doc["_id"])
+                if summary:
+                    theme = ThemeSummary.from_document(theme_doc)
+                else:
+                    theme = ThemeResponse.from_document(theme_doc)
+                    theme_cache.set(theme.theme_id, theme)
+                found[theme.theme_id] = theme
+        themes = [found[theme_id] for theme_id in ordered_ids if theme_id in found]
+        missing = [theme_id for theme_id in ordered_ids if theme_id not in found]
+        return themes, missing
+    except Exception as e:
+        logger.error(f"Error getting themes batch: {e}")
+        raise
+
+
 def get_current_time():
     """Get current UTC time."""
     return datetime.utcnow()
 
 
-def get_popular_themes(limit: int = 10) -> List[ThemeResponse]:
-    """Get most downloaded themes."""
+async def get_trending_themes(window: str = "all", limit: int = 10) -> List[TrendingTheme]:
+    """Get the top themes for a trending window from the precomputed leaderboard.
+
+    ``window`` is "all" for lifetime downloads or a key of ``TRENDING_WINDOWS``
+    for time-decayed download scores. Each leaderboard holds the top
+    ``LEADERBOARD_SIZE`` themes and is recomputed when its cache entry expires.
+    """
     try:
-        db = get_database()
-        themes_collection = db.themes
-        themes = list(themes_collection.find().sort("download_count", -1).limit(limit))
-        for theme in themes:
-            theme["_id"] = str(theme["_id"])
-        return [ThemeResponse(**theme) for theme in themes]
+        leaderboard = leaderboard_cache.get(window)
+        if leaderboard is None:
+            db = get_database()
+            sort_field = "download_count" if window == "all" else trending_field(window)
+            themes = await db.themes.find(
+                {}, {**THEME_SUMMARY_PROJECTION, "trending": 1}
+            ).sort([(sort_field, -1), ("_id", -1)]).limit(LEADERBOARD_SIZE).to_list()
+            now = datetime.utcnow()
+            leaderboard = []
+            for theme in themes:
+                theme["_id"] = str(theme["_id"])
+                if window == "all":
+                    theme["score"] = theme.get("download_count", 0)
+                else:
+                    theme["score"] = decayed_score(theme.get("trending", {}).get(window), window, now)
+                leaderboard.append(TrendingTheme.from_document(theme))
+            leaderboard_cache.set(window, leaderboard)
+        return leaderboard[:limit]
     except Exception as e:
-        logger.error(f"Error getting popular themes: {e}")
+        logger.error(f"Error getting trending themes for {window}: {e}")
         raise
 
 
-def get_recent_themes(limit: int = 10) -> List[ThemeResponse]:
+async def get_popular_themes(limit: int = 10) -> List[TrendingTheme]:
+    """Get most downloaded themes."""
+    return await get_trending_themes("all", limit)
+
+
+async def get_recent_themes(limit: int = 10) -> List[ThemeSummary]:
     """Get recently uploaded themes."""
     try:
         db = get_database()
         themes_collection = db.themes
-        themes = list(themes_collection.find().sort("created_at", -1).limit(limit))
+        themes = await themes_collection.find({}, THEME_SUMMARY_PROJECTION).sort("created_at", -1).limit(limit).to_list()
         for theme in themes:
             theme["_id"] = str(theme["_id"])
-        return [ThemeResponse(**theme) for theme in themes]
+        return [ThemeSummary.from_document(theme) for theme in themes]
     except Exception as e:
         logger.error(f"Error getting recent themes: {e}")
         raise
 
 
-def get_all_tags() -> List[str]:
-    """Get all available tags."""
-    try:
-        db = get_database()
-        themes_collection = db.themes
-        pipeline = [
-            {"$unwind": "$tags"},
-            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$project": {"tag": "$_id", "_id": 0}}
-        ]
-        tags = list(themes_collection.aggregate(pipeline))
-        return [tag["tag"] for tag in tags]
-    except Exception as e:
-        logger.error(f"Error getting all tags: {e}")
-        raise 
\ No newline at end of file
+async def get_all_tags() -> List[str]:
+    """Get all available tags, most used first."""
+    return [stat["tag"] for stat in await get_tag_stats()]
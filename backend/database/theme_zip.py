@@ -0,0 +1,139 @@
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+import asyncio
+import hashlib
+import logging
+from .blobs import release_blob, store_blob
+from utils.zip_builder import compress_member, zip_layout
+
+logger = logging.getLogger(__name__)
+
+# Fields of a member kept in a theme's ZIP manifest
+MEMBER_FIELDS = ("name", "method", "crc", "size", "compressed_size")
+
+
+def _encode_members(members: Sequence[Tuple[str, bytes]]) -> Tuple[List[bytes], List[Dict[str, Any]], int, str]:
+    payloads, metrics = [], []
+    for name, data in members:
+        payload, member_metrics = compress_member(name, data)
+        payloads.append(payload)
+        metrics.append(member_metrics)
+    pieces, size = zip_layout(metrics)
+    digest = hashlib.sha256()
+    for piece in pieces:
+        digest.update(piece if isinstance(piece, bytes) else payloads[piece])
+    return payloads, metrics, size, digest.hexdigest()
+
+
+async def store_theme_zip(members: Sequence[Tuple[str, bytes]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Store a theme's files content-addressed and return the manifest of its ZIP.
+
+    Each member is encoded as it appears in the ZIP (stored or deflated) and
+    kept as its own blob, so a ``bgm.bcstm`` or icon shared by many themes is
+    stored once. The manifest lists the members with their blob IDs, plus the
+    ZIP's ``size`` and ``sha256``; ``ThemeZip`` assembles the ZIP from it on
+    read. Also returns the per-member compression metrics.
+    """
+    payloads, metrics, size, digest = await asyncio.to_thread(_encode_members, members)
+    stored: List[Dict[str, Any]] = []
+    try:
+        for payload, member_metrics in zip(payloads, metrics):
+            file_id = await store_blob(payload, member_metrics["name"])
+            stored.append({**{field: member_metrics[field] for field in MEMBER_FIELDS}, "file_id": file_id})
+    except Exception:
+        await release_theme_zip({"members": stored})
+        raise
+    return {"members": stored, "size": size, "sha256": digest, "created_at": datetime.utcnow()}, metrics
+
+
+async def release_theme_zip(manifest: Dict[str, Any]) -> List[Any]:
+    """Drop a ZIP's reference to each of its members; returns the IDs of the blobs freed."""
+    freed = []
+    for member in manifest["members"]:
+        try:
+            if await release_blob(member["file_id"]):
+                freed.append(member["file_id"])
+        except Exception as e:
+            logger.warning(f"Could not release ZIP member {member['file_id']}: {e}")
+    return freed
+
+
+class ThemeZip:
+    """A theme ZIP assembled from its manifest as it is read.
+
+    Has the parts of ``AsyncGridOut`` the download path uses, so
+    ``iter_file_chunks``, ``iter_file_range`` and ``get_file_digest`` accept
+    it. Headers are generated from the manifest; member payloads are opened
+    with ``open_member`` one at a time as the read position reaches them.
+    """
+
+    def __init__(self, manifest: Dict[str, Any], open_member: Callable[[Any], Awaitable[Any]]):
+        self._id = manifest["sha256"]
+        self._members = manifest["members"]
+        self._pieces, self.length = zip_layout(self._members)
+        self._offsets = []
+        offset = 0
+        for piece in self._pieces:
+            self._offsets.append(offset)
+            offset += len(piece) if isinstance(piece, bytes) else self._members[piece]["compressed_size"]
+        self.upload_date = manifest.get("created_at")
+        self.metadata = {"sha256": manifest["sha256"]}
+        self.md5 = None
+        self.filename = None
+        self.content_type = "application/zip"
+        self._open_member = open_member
+        self._member = None
+        self._member_index = None
+        self._member_position = 0
+        self._position = 0
+
+    async def seek(self, pos: int) -> int:
+        self._position = max(0, min(pos, self.length))
+        return self._position
+
+    async def _member_chunk(self, index: int, position: int) -> bytes:
+        if self._member_index != index:
+            await self.close()
+            self._member = await self._open_member(self._members[index]["file_id"])
+            self._member_index = index
+            self._member_position = 0
+        if self._member_position != position:
+            await self._member.seek(position)
+        chunk = await self._member.readchunk()
+        if not chunk:
+            raise OSError(f"ZIP member {self._members[index]['name']} is shorter than its manifest")
+        self._member_position = position + len(chunk)
+        return chunk
+
+    async def readchunk(self) -> bytes:
+        if self._position >= self.length:
+            return b""
+        # Empty pieces share their offset with the next one; bisect_right skips them
+        index = bisect_right(self._offsets, self._position) - 1
+        piece = self._pieces[index]
+        if isinstance(piece, bytes):
+            chunk = piece[self._position - self._offsets[index]:]
+        else:
+            remaining = self._members[piece]["compressed_size"] - (self._position - self._offsets[index])
+            chunk = (await self._member_chunk(piece, self._position - self._offsets[index]))[:remaining]
+        self._position += len(chunk)
+        return chunk
+
+    async def read(self, size: int = -1) -> bytes:
+        end = self.length if size < 0 else min(self.length, self._position + size)
+        parts = []
+        while self._position < end:
+            chunk = await self.readchunk()
+            overshoot = self._position - end
+            if overshoot > 0:
+                chunk = chunk[:len(chunk) - overshoot]
+                self._position = end
+            parts.append(chunk)
+        return b"".join(parts)
+
+    async def close(self):
+        if self._member is not None:
+            await self._member.close()
+            self._member = None
+            self._member_index = None
@@ -0,0 +1,58 @@
+from typing import Any, Dict
+from datetime import datetime
+import math
+
+# Decay time constant per trending window, in seconds. A download's weight
+# falls by a factor of e every window length.
+TRENDING_WINDOWS: Dict[str, float] = {
+    "24h": 24 * 3600.0,
+    "7d": 7 * 24 * 3600.0,
+}
+
+# Scores are stored as log(sum(count * exp((t - epoch) / tau))). Every theme
+# shares the epoch, so ordering by the stored value orders by the decayed
+# score at any instant, and nothing has to be rewritten as time passes.
+TRENDING_EPOCH = datetime(2025, 1, 1)
+
+
+def trending_field(window: str) -> str:
+    return f"trending.{window}"
+
+
+def _log_weight(count: int, at: datetime, tau: float) -> float:
+    return math.log(count) + (at - TRENDING_EPOCH).total_seconds() / tau
+
+
+def _log_add_exp(field_path: str, value: float) -> Dict[str, Any]:
+    """Aggregation expression for log(exp(field) + exp(value)), computed stably."""
+    return {"$let": {
+        "vars": {"current": {"$ifNull": [field_path, float("-inf")]}},
+        "in": {"$add": [
+            {"$max": ["$$current", value]},
+            {"$ln": {"$add": [1, {"$exp": {"$multiply": [-1, {"$abs": {"$subtract": ["$$current", value]}}]}}]}}
+        ]}
+    }}
+
+
+def trending_increment(count: int, at: datetime) -> Dict[str, Any]:
+    """``$set`` fields for an update pipeline that add ``count`` downloads at ``at``."""
+    return {
+        trending_field(window): _log_add_exp(f"${trending_field(window)}", _log_weight(count, at, tau))
+        for window, tau in TRENDING_WINDOWS.items()
+    }
+
+
+def decayed_score(log_score: float, window: str, now: datetime) -> float:
+    """Current decayed download score from a stored log score."""
+    if log_score is None or log_score == float("-inf"):
+        return 0.0
+    tau = TRENDING_WINDOWS[window]
+    return math.exp(log_score - (now - TRENDING_EPOCH).total_seconds() / tau)
+
+
+def download_increment(count: int, at: datetime) -> list:
+    """Update pipeline adding ``count`` downloads at ``at`` to the lifetime and trending counters."""
+    return [{"$set": {
+        "download_count": {"$add": [{"$ifNull": ["$download_count", 0]}, count]},
+        **trending_increment(count, at)
+    }}]
@@ -1,22 +1,49 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import router      # Import routers
 from routes.auth import auth_router
 from routes.contact import contact_router
 from routes.theme import theme_router
+from database import close_mongo_connection, download_counter, ensure_indexes, suggestion_index
+import logging
 import dotenv
 
 
 dotenv.load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bootstrap indexes, the suggestion index and the download counter flusher; flush and disconnect on shutdown."""
+    if os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true":
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            logger.error(f"Index bootstrap failed: {e}")
+    try:
+        await suggestion_index.build()
+    except Exception as e:
+        logger.error(f"Suggestion index build failed: {e}")
+    suggestion_index.start()
+    download_counter.start()
+    yield
+    await suggestion_index.stop()
+    await download_counter.stop()
+    await close_mongo_connection()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Switch Theme API",
     description="API for Switch Theme platform",
     version="1.0.0",
     swagger_ui_parameters={"defaultModelsExpandDepth": -1},
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -0,0 +1,158 @@
+"""Maintenance commands for the Switch Theme backend.
+
+Run from the backend directory, e.g.:
+
+    python manage.py indexes          # create any missing indexes
+    python manage.py indexes --check  # only report missing indexes
+    python manage.py migrate-images   # move embedded base64 images to theme_images
+    python manage.py backfill-variants --workers 8
+    python manage.py rebuild-tag-stats
+    python manage.py dedup-report     # storage saved by content-addressed files
+    python manage.py split-zips       # store whole theme ZIPs by member
+    python manage.py migrate-storage --from gridfs --to local
+"""
+import argparse
+import asyncio
+import sys
+
+import dotenv
+
+dotenv.load_dotenv()
+
+from database import (
+    backfill_preview_variants,
+    close_mongo_connection,
+    ensure_indexes,
+    get_dedup_report,
+    get_missing_indexes,
+    migrate_blobs,
+    migrate_embedded_images,
+    rebuild_tag_stats,
+    split_theme_zips,
+)
+
+
+async def indexes_command(args) -> int:
+    if not args.check:
+        created = await ensure_indexes()
+        for collection, names in created.items():
+            print(f"{collection}: {', '.join(names) or '-'}")
+    missing = await get_missing_indexes()
+    for collection, names in missing.items():
+        print(f"missing on {collection}: {', '.join(names)}")
+    if not missing:
+        print("All expected indexes are present")
+    return 1 if missing else 0
+
+
+async def migrate_images_command(args) -> int:
+    migrated = await migrate_embedded_images(batch_size=args.batch_size)
+    print(f"Moved images out of {migrated} theme documents")
+    return 0
+
+
+async def backfill_variants_command(args) -> int:
+    processed = await backfill_preview_variants(workers=args.workers)
+    print(f"Generated preview variants for {processed} themes")
+    return 0
+
+
+async def rebuild_tag_stats_command(args) -> int:
+    tags = await rebuild_tag_stats()
+    print(f"Rebuilt tag stats for {tags} tags")
+    return 0
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+async def dedup_report_command(args) -> int:
+    report = await get_dedup_report()
+    members, files, unsplit = report["members"], report["files"], report["unsplit_members"]
+    print(f"Themes: {report['themes']} ({report['unreadable_files']} unreadable ZIPs skipped)")
+    print(
+        f"Stored by member: {members['themes']} themes, {members['distinct_contents']} distinct members; "
+        f"{_format_bytes(members['logical_bytes'])} referenced, {_format_bytes(members['stored_bytes'])} stored "
+        f"(ratio {members['ratio']:.2f})"
+    )
+    print(
+        f"Whole ZIP files: {files['themes']} themes, {files['distinct_ids']} stored, {files['distinct_contents']} distinct; "
+        f"{_format_bytes(files['logical_bytes'])} referenced, {_format_bytes(files['current_bytes'])} stored, "
+        f"{_format_bytes(files['stored_bytes'])} deduplicated (ratio {files['ratio']:.2f})"
+    )
+    print(
+        f"Members of whole ZIPs: {unsplit['distinct_contents']} distinct; "
+        f"{_format_bytes(unsplit['logical_bytes'])} referenced, {_format_bytes(unsplit['stored_bytes'])} once split "
+        f"(ratio {unsplit['ratio']:.2f})"
+    )
+    return 0
+
+
+async def migrate_storage_command(args) -> int:
+    counts = await migrate_blobs(args.source, args.target, delete_source=args.delete_source)
+    print(f"Copied {counts['copied']} files, skipped {counts['skipped']} already present, {counts['failed']} failed")
+    return 1 if counts["failed"] else 0
+
+
+async def split_zips_command(args) -> int:
+    counts = await split_theme_zips()
+    print(f"Split {counts['split']} theme ZIPs into members, {counts['failed']} failed")
+    return 1 if counts["failed"] else 0
+
+
+COMMANDS = {
+    "indexes": indexes_command,
+    "migrate-images": migrate_images_command,
+    "backfill-variants": backfill_variants_command,
+    "rebuild-tag-stats": rebuild_tag_stats_command,
+    "dedup-report": dedup_report_command,
+    "migrate-storage": migrate_storage_command,
+    "split-zips": split_zips_command,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Switch Theme backend maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes = subparsers.add_parser("indexes", help="Create or check the database indexes")
+    indexes.add_argument("--check", action="store_true", help="Only report missing indexes")
+
+    migrate_images = subparsers.add_parser("migrate-images", help="Move preview_b64/icon_b64 into theme_images")
+    migrate_images.add_argument("--batch-size", type=int, default=100)
+
+    backfill_variants = subparsers.add_parser("backfill-variants", help="Generate missing resized preview variants")
+    backfill_variants.add_argument("--workers", type=int, default=4, help="Parallel resize processes")
+
+    subparsers.add_parser("rebuild-tag-stats", help="Recompute tag_stats from the themes collection")
+
+    subparsers.add_parser("dedup-report", help="Report the deduplication ratio of stored theme files")
+
+    subparsers.add_parser("split-zips", help="Store theme ZIPs that are kept whole by member instead")
+
+    migrate_storage = subparsers.add_parser("migrate-storage", help="Copy theme files between storage backends")
+    migrate_storage.add_argument("--from", dest="source", choices=["gridfs", "local"], required=True)
+    migrate_storage.add_argument("--to", dest="target", choices=["gridfs", "local"], required=True)
+    migrate_storage.add_argument("--delete-source", action="store_true", help="Delete each file from the source once copied")
+
+    return parser
+
+
+async def run(args) -> int:
+    try:
+        return await COMMANDS[args.command](args)
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
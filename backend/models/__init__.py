@@ -23,7 +23,18 @@ from .theme import (
     ThemeCreate,
     ThemeUpdate,
     ThemeResponse,
+    ThemeSummary,
+    TrendingTheme,
+    TrendingResponse,
     ThemeListResponse,
+    FacetCount,
+    ThemeSearchResponse,
+    Suggestion,
+    SuggestionResponse,
+    ThemeBatchRequest,
+    ThemeBatchResponse,
+    TagCount,
+    TagListResponse,
     ThemeFileInfo
 )
 
@@ -46,6 +57,17 @@ __all__ = [
     "ThemeCreate",
     "ThemeUpdate",
     "ThemeResponse",
+    "ThemeSummary",
+    "TrendingTheme",
+    "TrendingResponse",
     "ThemeListResponse",
+    "FacetCount",
+    "ThemeSearchResponse",
+    "Suggestion",
+    "SuggestionResponse",
+    "ThemeBatchRequest",
+    "ThemeBatchResponse",
+    "TagCount",
+    "TagListResponse",
     "ThemeFileInfo"
 ] 
\ No newline at end of file
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, computed_field, field_validator
+from typing import List, Optional, Union
 from datetime import datetime
 from bson import ObjectId
+from utils.serialization import construct_trusted
 
 class PyObjectId(ObjectId):
     @classmethod
@@ -43,9 +44,7 @@ class ThemeResponse(ThemeBase):
     id: Optional[str] = Field(None, alias="_id", description="MongoDB document ID")
     theme_id: Optional[int] = Field(None, description="Integer theme ID for compatibility")
     user_id: str = Field(..., description="User ID who uploaded the theme")
-    zip_file_id: str = Field(..., description="GridFS file ID for ZIP file")
-    preview_b64: Optional[str] = Field(None, description="Base64 encoded preview image")
-    icon_b64: Optional[str] = Field(None, description="Base64 encoded icon image")
+    zip_file_id: Optional[str] = Field(None, description="Blob store file ID of a ZIP stored whole; unset for themes stored by member")
     bgm_info: Optional[str] = Field(None, description="BGM information")
     download_count: int = Field(default=0, description="Number of downloads")
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -55,12 +54,124 @@ class ThemeResponse(ThemeBase):
         validate_by_name = True
         arbitrary_types_allowed = True
 
+    @classmethod
+    def from_document(cls, doc: dict) -> "ThemeResponse":
+        """Build from a themes document (``_id`` as str) without validating it."""
+        return construct_trusted(cls, doc)
+
+    @computed_field
+    @property
+    def preview_url(self) -> Optional[str]:
+        return f"/themes/{self.theme_id}/preview" if self.theme_id is not None else None
+
+    @computed_field
+    @property
+    def icon_url(self) -> Optional[str]:
+        return f"/themes/{self.theme_id}/icon" if self.theme_id is not None else None
+
+
+class ThemeSummary(BaseModel):
+    """Card-sized view of a theme for listings; images are linked, not embedded."""
+    id: Optional[str] = Field(None, alias="_id", description="MongoDB document ID")
+    theme_id: int = Field(..., description="Integer theme ID")
+    name: str
+    author_name: str
+    short_description: str
+    tags: List[str] = Field(default=[])
+    user_id: str
+    download_count: int = Field(default=0)
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        validate_by_name = True
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "ThemeSummary":
+        """Build from a themes document (``_id`` as str) without validating it."""
+        return construct_trusted(cls, doc)
+
+    @computed_field
+    @property
+    def preview_url(self) -> str:
+        return f"/themes/{self.theme_id}/preview"
+
+    @computed_field
+    @property
+    def thumbnail_url(self) -> str:
+        return f"/themes/{self.theme_id}/preview?size=400&format=webp"
+
+    @computed_field
+    @property
+    def icon_url(self) -> str:
+        return f"/themes/{self.theme_id}/icon"
+
+
+class TrendingTheme(ThemeSummary):
+    score: float = Field(..., description="Lifetime downloads, or the time-decayed download score")
+
+
+class TrendingResponse(BaseModel):
+    window: str
+    themes: List[TrendingTheme]
+
 
 class ThemeListResponse(BaseModel):
-    themes: List[ThemeResponse]
+    themes: List[ThemeSummary]
+    total: Optional[int] = Field(None, description="Total matches; omitted when include_total is false")
+    exact: Optional[bool] = Field(None, description="False when total is an estimate or a cached count")
+    page: Optional[int] = Field(None, description="Page number; omitted in cursor mode")
+    limit: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class ThemeSearchResponse(BaseModel):
+    themes: List[ThemeSummary]
     total: int
     page: int
     limit: int
+    tags: List[FacetCount] = Field(default=[], description="Most common tags among all matches")
+    authors: List[FacetCount] = Field(default=[], description="Most common authors among all matches")
+
+
+class Suggestion(BaseModel):
+    kind: str = Field(..., description='"theme", "tag" or "author"')
+    value: str
+    theme_id: Optional[int] = Field(None, description="Set for theme suggestions")
+    downloads: int
+
+
+class SuggestionResponse(BaseModel):
+    suggestions: List[Suggestion]
+
+
+class ThemeBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, description="Integer theme IDs, in the order wanted")
+    summary: bool = Field(True, description="Return card-sized summaries instead of full themes")
+
+
+class ThemeBundleRequest(BaseModel):
+    theme_ids: List[int] = Field(..., min_length=1, description="Integer theme IDs to bundle, in order")
+    layout: str = Field("zip", pattern="^(zip|folders)$", description="One ZIP per theme, or each theme's files in its own folder")
+
+
+class ThemeBatchResponse(BaseModel):
+    themes: List[Union[ThemeResponse, ThemeSummary]]
+    missing: List[int] = Field(default=[], description="Requested IDs that do not exist")
+
+
+class TagCount(BaseModel):
+    tag: str
+    count: int
+
+
+class TagListResponse(BaseModel):
+    tags: List[TagCount]
 
 
 class ThemeFileInfo(BaseModel):
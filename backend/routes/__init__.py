@@ -12,10 +12,22 @@ async def database_status():
     """Test database connection."""
     try:
         from database import test_connection
-        is_connected = test_connection()
+        is_connected = await test_connection()
         if is_connected:
             return {"status": "success", "message": "Database tested successfully"}
         else:
             return {"status": "error", "message": "Database connection failed"}
     except Exception as e:
-        return {"status": "error", "message": f"Database error: {str(e)}"}
\ No newline at end of file
+        return {"status": "error", "message": f"Database error: {str(e)}"}
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss/eviction statistics for this worker's in-process caches."""
+    from database import get_cache_stats
+    return {"caches": get_cache_stats()}
+
+@router.get("/upload-stats")
+async def upload_stats():
+    """Per-member compression ratio and CPU time of theme ZIPs built by this worker."""
+    from utils.zip_builder import zip_build_stats
+    return zip_build_stats.stats()
@@ -6,13 +6,15 @@ import base64
 import sys
 import os
 import re
+from typing import Optional
 
 # Add the backend directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models import UserCreate, UserLogin, UserResponse, Token, PasswordReset, PasswordChange, ProfileUpdate
+from models import UserCreate, UserLogin, UserResponse, Token, PasswordReset, PasswordChange, ProfileUpdate, ThemeListResponse
 from .utils import ( get_password_hash,  create_access_token,  get_current_user, verify_password, logout_user, invalidate_user_tokens, ACCESS_TOKEN_EXPIRE_MINUTES)
-from database import ( get_user_by_email, get_user_by_username, create_user, update_user, update_user_profile, soft_delete_user, hard_delete_user, get_user_by_id, add_token_to_blacklist, is_token_blacklisted, blacklist_user_tokens, cleanup_expired_tokens, get_deactivated_user_by_email, get_deactivated_user_by_username)
+from database import ( get_user_by_email, get_user_by_username, create_user, update_user, update_user_profile, soft_delete_user, hard_delete_user, get_user_by_id, add_token_to_blacklist, is_token_blacklisted, blacklist_user_tokens, cleanup_expired_tokens, get_deactivated_user_by_email, get_deactivated_user_by_username, get_themes_by_user)
+from utils.pagination import InvalidCursor
 
 # Create router
 auth_router = APIRouter()
@@ -33,27 +35,27 @@ def validate_username(username: str) -> tuple[bool, str]:
     return True, ""
 
 
-def is_username_taken(username: str) -> bool:
+async def is_username_taken(username: str) -> bool:
     """Check if username is already taken."""
-    existing_user = get_user_by_username(username)
+    existing_user = await get_user_by_username(username)
     return existing_user is not None
 
 
 # Helper for user lookup with deactivation logic
-def get_active_or_deactivated_user(email=None, username=None):
+async def get_active_or_deactivated_user(email=None, username=None):
     if email:
-        user = get_user_by_email(email)
+        user = await get_user_by_email(email)
         if user:
             return user, None
-        deactivated = get_deactivated_user_by_email(email)
+        deactivated = await get_deactivated_user_by_email(email)
         if deactivated:
             return None, deactivated
         return None, None
     if username:
-        user = get_user_by_username(username)
+        user = await get_user_by_username(username)
         if user:
             return user, None
-        deactivated = get_deactivated_user_by_username(username)
+        deactivated = await get_deactivated_user_by_username(username)
         if deactivated:
             return None, deactivated
         return None, None
@@ -72,7 +74,7 @@ async def signup(user_data: UserCreate):
         )
     
     # Check if username is already taken
-    user, deactivated = get_active_or_deactivated_user(username=user_data.username)
+    user, deactivated = await get_active_or_deactivated_user(username=user_data.username)
     if user or deactivated:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -80,7 +82,7 @@ async def signup(user_data: UserCreate):
         )
     
     # Check if user already exists
-    user, deactivated = get_active_or_deactivated_user(email=user_data.email)
+    user, deactivated = await get_active_or_deactivated_user(email=user_data.email)
     if user or deactivated:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -89,7 +91,7 @@ async def signup(user_data: UserCreate):
     
     # Hash password and create user
     hashed_password = get_password_hash(user_data.password)
-    user = create_user(
+    user = await create_user(
         email=user_data.email,
         username=user_data.username,
         hashed_password=hashed_password
@@ -114,7 +116,7 @@ async def signup(user_data: UserCreate):
 @auth_router.post("/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     """Authenticate user and return access token."""
-    user, deactivated = get_active_or_deactivated_user(email=user_credentials.email)
+    user, deactivated = await get_active_or_deactivated_user(email=user_credentials.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -159,7 +161,7 @@ async def logout(request: Request, current_user: dict = Depends(get_current_user
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
-        success = logout_user(token, current_user.email)
+        success = await logout_user(token, current_user.email)
         if success:
             return {"message": "Successfully logged out"}
     return {"message": "Logout successful"}
@@ -168,7 +170,7 @@ async def logout(request: Request, current_user: dict = Depends(get_current_user
 @auth_router.get("/profile", response_model=UserResponse)
 async def get_profile(current_user: dict = Depends(get_current_user)):
     """Get current user profile."""
-    user, deactivated = get_active_or_deactivated_user(email=current_user.email)
+    user, deactivated = await get_active_or_deactivated_user(email=current_user.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -209,7 +211,7 @@ async def update_profile(
     current_user: dict = Depends(get_current_user)
 ):
     """Update user profile."""
-    user, deactivated = get_active_or_deactivated_user(email=current_user.email)
+    user, deactivated = await get_active_or_deactivated_user(email=current_user.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -234,7 +236,7 @@ async def update_profile(
     update_data = profile_data.dict(exclude_unset=True)
     
     # Update profile
-    success = update_user_profile(current_user.email, update_data)
+    success = await update_user_profile(current_user.email, update_data)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -242,7 +244,7 @@ async def update_profile(
         )
     
     # Get updated user
-    updated_user = get_user_by_email(current_user.email)
+    updated_user = await get_user_by_email(current_user.email)
     return UserResponse(
         _id=updated_user["_id"],
         email=updated_user["email"],
@@ -263,7 +265,7 @@ async def change_password(
     current_user: dict = Depends(get_current_user)
 ):
     """Change user password."""
-    user, deactivated = get_active_or_deactivated_user(email=current_user.email)
+    user, deactivated = await get_active_or_deactivated_user(email=current_user.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -293,7 +295,7 @@ async def change_password(
     
     # Update password
     hashed_new_password = get_password_hash(password_data.new_password)
-    success = update_user(current_user.email, {"hashed_password": hashed_new_password})
+    success = await update_user(current_user.email, {"hashed_password": hashed_new_password})
     
     if not success:
         raise HTTPException(
@@ -307,7 +309,7 @@ async def change_password(
 @auth_router.post("/reset-password")
 async def reset_password(password_data: PasswordReset):
     """Request password reset (placeholder for email functionality)."""
-    user, deactivated = get_active_or_deactivated_user(email=password_data.email)
+    user, deactivated = await get_active_or_deactivated_user(email=password_data.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -340,7 +342,7 @@ async def delete_account(
     current_user: dict = Depends(get_current_user)
 ):
     """Delete user account (soft delete by default, hard delete if specified)."""
-    user, deactivated = get_active_or_deactivated_user(email=current_user.email)
+    user, deactivated = await get_active_or_deactivated_user(email=current_user.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -361,14 +363,14 @@ async def delete_account(
     
     if hard_delete:
         # Hard delete - permanently remove from database
-        success = hard_delete_user(current_user.email)
+        success = await hard_delete_user(current_user.email)
         message = "Account permanently deleted"
     else:
         # Soft delete - set is_active to False and invalidate all tokens
-        success = soft_delete_user(current_user.email)
+        success = await soft_delete_user(current_user.email)
         if success:
             # Invalidate all tokens for this user
-            invalidate_user_tokens(current_user.email)
+            await invalidate_user_tokens(current_user.email)
         message = "Account deactivated (soft delete) - all tokens invalidated"
     
     if not success:
@@ -383,7 +385,7 @@ async def delete_account(
 @auth_router.get("/verify-token")
 async def verify_token_endpoint(current_user: dict = Depends(get_current_user)):
     """Verify if the current token is valid."""
-    user, deactivated = get_active_or_deactivated_user(email=current_user.email)
+    user, deactivated = await get_active_or_deactivated_user(email=current_user.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -414,7 +416,7 @@ async def upload_profile_image(
     current_user: dict = Depends(get_current_user)
 ):
     """Upload a new profile image."""
-    user, deactivated = get_active_or_deactivated_user(email=current_user.email)
+    user, deactivated = await get_active_or_deactivated_user(email=current_user.email)
     if not user:
         if deactivated:
             raise HTTPException(
@@ -490,7 +492,7 @@ async def upload_profile_image(
         image_data_url = f"data:image/jpeg;base64,{image_base64}"
         
         # Update user profile with image data
-        success = update_user_profile(current_user.email, {"profile_image": image_data_url})
+        success = await update_user_profile(current_user.email, {"profile_image": image_data_url})
         
         if not success:
             raise HTTPException(
@@ -508,9 +510,9 @@ async def upload_profile_image(
 
 
 @auth_router.get("/public-profile/{username}")
-def public_profile(username: str = Path(..., description="The username to look up")):
+async def public_profile(username: str = Path(..., description="The username to look up")):
     """Get a user's public profile by username (unauthenticated)."""
-    user, deactivated = get_active_or_deactivated_user(username=username)
+    user, deactivated = await get_active_or_deactivated_user(username=username)
     if not user or not user.get("is_active", True):
         if deactivated:
             raise HTTPException(status_code=404, detail="User not found (deactivated)")
@@ -523,4 +525,20 @@ def public_profile(username: str = Path(..., description="The username to look u
         "website": user.get("website"),
         "social_links": user.get("social_links", {}),
         "profile_image": user.get("profile_image"),
-    } 
\ No newline at end of file
+    }
+
+
+@auth_router.get("/public-profile/{username}/themes", response_model=ThemeListResponse)
+async def public_profile_themes(
+    username: str = Path(..., description="The username to look up"),
+    limit: int = Query(20, ge=1, le=50, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor")
+):
+    """Get the themes a user uploaded, newest first (unauthenticated)."""
+    user, deactivated = await get_active_or_deactivated_user(username=username)
+    if not user or not user.get("is_active", True):
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        return ThemeListResponse(**await get_themes_by_user(str(user["_id"]), limit=limit, cursor=cursor))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -65,7 +65,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """Get the current user from the JWT token."""
     token = credentials.credentials
     # Check if token is blacklisted
-    if is_token_blacklisted(token):
+    if await is_token_blacklisted(token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has been invalidated",
@@ -79,7 +79,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     # Fetch the user from the database using email
-    user = get_user_by_email(token_data.email)
+    user = await get_user_by_email(token_data.email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -98,24 +98,26 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     )
 
 
-def logout_user(token: str, email: str):
+async def logout_user(token: str, email: str):
     """Logout user by blacklisting their token."""
     try:
         # Decode token to get expiration
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         exp_timestamp = payload.get("exp")
         if exp_timestamp:
-            expires_at = datetime.fromtimestamp(exp_timestamp)
+            expires_at = datetime.fromtimestamp(exp_timestamp, timezone.utc).replace(tzinfo=None)
         else:
             expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
         # Add token to blacklist
-        add_token_to_blacklist(token, email, expires_at)
+        await add_token_to_blacklist(token, email, expires_at)
         return True
     except Exception:
         return False
 
 
-def invalidate_user_tokens(email: str):
+async def invalidate_user_tokens(email: str):
     """Invalidate all tokens for a user (used when account is deactivated)."""
-    return blacklist_user_tokens(email) 
\ No newline at end of file
+    # Tokens issued up to now are all expired once a full token lifetime has passed
+    expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return await blacklist_user_tokens(email, expires_at)
\ No newline at end of file
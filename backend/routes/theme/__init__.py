@@ -1,20 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from fastapi.responses import StreamingResponse
-from typing import Optional
-import zipfile
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import io
 import logging
+import os
+import re
+import zipfile
 import base64
+import secrets
 from bson import ObjectId
 
-from models.theme import ThemeCreate, ThemeUpdate, ThemeResponse, ThemeListResponse
+from models.theme import ThemeCreate, ThemeUpdate, ThemeResponse, ThemeListResponse, TagListResponse, TrendingResponse, ThemeBatchRequest, ThemeBatchResponse, ThemeBundleRequest, ThemeSearchResponse, SuggestionResponse
 from models.auth import UserResponse
-from database.theme import ( store_file, create_theme, get_theme, get_file, increment_download_count, get_themes, update_theme, delete_theme)
+from database.theme import ( LEADERBOARD_SIZE, create_theme, get_theme, open_theme_zip, get_file_digest, get_zip_content_size, iter_file_chunks, iter_file_range, get_themes, search_themes, get_themes_batch, get_themes_by_user, get_trending_themes, update_theme, delete_theme)
+from database.tags import get_tag_stats
+from database.download_buffer import download_counter
+from database.suggestions import SUGGESTION_KINDS, suggestion_index
+from database.storage import LocalFile
+from database.theme_zip import release_theme_zip, store_theme_zip
+from database.images import ORIGINAL_VARIANT, get_theme_image, store_preview_variants
 from routes.auth.utils import get_current_user
 from utils.smdh_generator import create_smdh_file
+from utils.pagination import InvalidCursor
+from utils.image_variants import VARIANT_WIDTHS, variant_name
+from utils.http_cache import (
+    FALLBACK_CACHE_CONTROL,
+    IMMUTABLE_CACHE_CONTROL,
+    RangeNotSatisfiable,
+    etag_matches,
+    format_http_date,
+    if_range_matches,
+    is_not_modified,
+    make_etag,
+    parse_range
+)
+from utils.zip_builder import StreamingZipWriter, zip_build_stats
+from utils.serialization import JSONBytesResponse, dump_json
 
 logger = logging.getLogger(__name__)
 
+# Most theme IDs one batch lookup may resolve
+BATCH_MAX_IDS = 200
+
+# Limits of one multi-theme bundle download; the size is the sum of the theme ZIPs,
+# or of the files inside them for the "folders" layout
+BUNDLE_MAX_THEMES = int(os.getenv("BUNDLE_MAX_THEMES", "50"))
+BUNDLE_MAX_BYTES = int(os.getenv("BUNDLE_MAX_BYTES", str(512 * 1024 * 1024)))
+
 theme_router = APIRouter()
 
 DEFAULT_ICON_BASE64 = """iVBORw0KGgoAAAANSUhEUgAAALQAAAC0CAYAAAA9zQYyAAAAAXNSR0IArs4c6QAAG3JJREFUeF7tnQO05EgXx2u+tW3b9u6szZm1MWvbtmdt27Zt27ZtzXd+dU69U11TSSrdSTqvcu85fXredFJJ3ftP1XX6DBo0aJASEg5EwoE+AuhIJCnT0BwQQAsQouKAADoqccpkBNCCgag4IICOSpwyGQG0YCAqDgigoxKnTEYALRiIigMC6KjEKZMRQAsGouKAADoqccpkBNCCgag4IICOSpwyGQG0YCAqDgigoxKnTEYALRiIigMC6KjEKZMRQAsGouKAADoqccpkBNCCgag4IICOSpwyGQG0YCAqDgigoxKnTEYALRiIigMC6KjEKZMRQAsGouKAADoqccpkBNCCgag4IICOSpwyGQG0YCAqDgigoxKnTEYALRiIigMC6KjEKZMRQAsGouKAADoqccpkBNCCgag4IICOSpwyGQG0YCAqDgigoxKnTEYALRiIigMC6KjEKZMRQAsGouKAADoqccpkBNCCgag4IICOSpwyGQG0YCAqDgigoxKnTEYALRiIigMC6KjEKZMRQAsGouJAdID+7rvv1Mcff9wipCGGGELxcel///ufGnLIIXv+m78nnHBCNdRQQ5Ui5L/++ku9/vrrpYxd50FnmWWWym4vOkAfffTRao899mhh4PDDD6+GG264wZg69NBDq5FGGkn16dNH/zb22GOryy+/XE0wwQSlCODDDz9Uk046aSlj13nQQYMGVXZ70QG6f//+6sYbb2yLgbPPPru65ZZb1HjjjdfW+VknCaCzONT571EB+s8//1STTz65+uyzz7ycMSsxP5p///fffz3HLrvssuriiy9WY4wxRuec9YzQRECPNdZY6quvviqFn75BexWg//33X/X999/3zAMwAmIDynfffVetttpqLccsv/zyauSRR9aqBd/mM+KII2rgDxw4UP344496zAEDBqiTTjpJ8VsZ5AKahwq1x6ffc/1//vlHoXf3ZppzzjnV008/XdkUehWgr7nmGnXOOef0MAeA24D++eef1WuvvaaBAAHiL7/80qs/8/sDDzygVl55ZfXDDz/o42ebbTa10EILeQG2wAILqFVWWaUjwbiA5v622WYbNddcc3nH/fvvv/X82qHffvtN8WmHfvrpp7YepMcff1zz1KZVV11VIbeqqNcA+uuvv1YzzDCD4juU5ptvPvXYY48lHn7fffcpdG4eBIgV01ZL7BPxfJx44olqiy22CL38YMe5gB5zzDHVueeeq1ZaaaW2x0w6EUOsXWOs3XMPOOAAdfjhh7fc0k477aSOO+64wueXNGCvAPTvv/+udthhB3X22WfnYszmm2+uzjzzzMRzMABXXHHF4DEB+/HHH6822WSTttSSKgEdPKkCD9x2223Vqaee2jIi/Npxxx0LvEr6ULUHNKvFzTffrDbddNNcqzPTPv3009WWW26ZyAG2wtVXXz0Xs0cbbTTFqrPnnnvm9lfHDui1115bXXHFFS38vOGGG1S/fv1y8biTg2sPaFSMjTbaSN1+++0tWyi+YlSKUUcdVY0wwggtqgIBEv5/nXXWUVNMMUUif+666y51yCGHqF9//VU/LHyjT2dt1fi0d9llF3XggQcmGnS+i8YO6KWXXlrBU5tefPFFNfPMM3eC0Vzn1h7QGIHorbZ7jUDJnXfeqfr27ZtrsqEH//LLL+rtt99W++23n36Q7GvbY2DQHXbYYWqUUUYJGjp2QGPcPvPMMz28YFHh77RFJYhxOQ6qNaDffPNNtfjii6tPP/20Z0qsvuhqGGhl0xdffKH22msvHT30eRvYGdCnWalRRbLIBTTnb7jhhmruuefW7kQeVD48IOwCeEH45rckYzXrmlX+PuWUUypcp4YAMob3xBNPXNlt1BbQAAg32W233dbCjJlmmkldeumliu8qCL83q/DJJ5/sdWUNO+yw2ktx4YUXKv6dRr7ACn5o8yGvhA9/841nxfzNAwOwxxlnHP3wEKYH8EQ1Rx999J4Pq2KSX7tsfuG1+fbbb3suM8888yh06HHHHbfsS/eMX0tAs8UD2q233lqx/RtC0IceeqjaddddK12x8Ofuvffe6rTTTlP4hn2EvxUjFKEmraZVRQqr9izAD2TmPkjLLbecjrzywFVFtQQ0gl9vvfXUI4880sKHeeedVz/xrFJVE6A+5phjtKpjRyvNfbCSsqMce+yxaqKJJvLeXlWAZrfYYIMNKmXR559/rsYff/yWa3IPp5xyit5JqqJaAhrn/EEHHdSyxaNLoo8B6m4REUh84QQQfAEeVIQlllhCB0t8CU5VARqDeamllkpl0yeffKIuuugird+SMjvJJJNoQA4zzDBtsffJJ58cTDZ4gpAlO2tVVDtAI/TppptOEUwxxBa+2267qaOOOqoqviReB5ceqgVqj32P9glENAGVLw31vffeU2+99ZZ65513FEYv/8ajggHKts345tv8O++kX3nlFR1VTSPca7jZbOKBBNzTTDONlsHUU0+t/803CVvIAaPc/jbqlS9IdcQRR+hU3ioN2loBGh8w2/b999/fwuhZZ51VXXvttTqTrg4E4K666iodXOEBdAmhs1KjfoQar3/88YdOluIDuPHsmL9JniK/AnuCbz6E65NyNchuI8stjfJESQEkBikrOA8p3+bfqH94ZR566CFtPBvCQD7hhBM6ShVoR9a1ATQgQd9i5bMNLzLfWJkJY9vVJe1Mtuhzbr31VrX77rvrhCgfqHHH3XHHHcF+6qT7A8gA2AU0gEcFeu6553pOZXsPSWjKA+g0viETAM1uQrWQIbwtpB2sscYaRbM9dbzaAJrSJCJ7L7zwQssNA4p77rmnUsMiVAI8hFTIoFP70jw322wzLdSytlyMU1Je7YIG3HlkGGZRUYBOug6uOnT0JZdcMutWCv29FoDm6Wb7xotgh52xjlkFF1xwwaBJcy4r2TfffKOTynEXof+VQVzr6quvVjvvvHNL4IdrsUoS3cSwDQm4tHt/GKasgHbK5vTTT69effXVzCFdQLPSrr/++gpvBSoNaQDmg2rDv01abubgSulSM/hDPnSVVAtAk+K5wgortLjDWNX22WcfnWuRRqgnRKdeeukl9fLLL2sj64MPPlDvv/++ztBjDJdw/j/66KM695mtMS8BZlxjjO1Wx6A/k11GhBGfdJmEnk2VDfM2RN626+703QPRT3ZEQ3iRAC455ujsrP7YNHzzN+oEiwSrPzo+H/7mAWARcfNfMCpJKqsy7M1cug5omIjhhPVvE082W6nr27SPYdXYfvvt1U033aQ9DuiO9iqCkUJAxCV03vnnn19HsBDqVlttlWlEmTEQ3Pnnn68z7ljJbALMAHnffffNjBoWAXQMUnYvu8qdqGVITSW6N3aJC+i0+wLs8JdFhG/zAfR4bfgYLw5GJHk4oXkuRfCj64CGIYCOXAibUDUIYJDnAEh8ZNJKyaVAxfAR/uCNN954sJ8efPBBtdhii/UkHaEikEYKuGeccUbtQ/a1MjBqBiswK5NNWPWoGQcffLD2CFRBAGiOOeZoebAIZrB7ZJEP0Ky03QqbZ91v6O9dXaGfeuopte666+on2ybUD1bBtC2bFZnk/HvvvVefig7ISo9xiQsMSgI0bkHcam4WHUEFUh0XWWQRtfDCCyu2b6OSAObLLrtM6/oEJWwC/OjSBBKy3GWhggk5DgOasjGbQitEXEDzQKLCVBmmDplj3mO6BmhAt91226nzzjuvBVisENSmJdXZmQlS1oPT3qgYABGdGVCZGkHyQWw90ZybBGjzO7sCgiXIQI4GxtLdd9+tXYqmoNYcy+p+5JFH6tWZTLkqieDNMsss03JJbA5UnizyAfqjjz6q9IHMusd2fu8aoLHMiVTZ7i6AhAts//33T53LG2+8oQi2GH8rBg2rJzoxCTEm14JcZlfgDGwDmlUZVxdGTlLiESswK7Rr5QNgHio+7YaM2xGaOYddzFWpSKDCJsgiop0kfxlihRZAZ3Et4Xc8A2z5blssKlBIF03zPLBCIjCsdAggoYMT4CDki25sUhhDAE2kixyRCy64QF1yySWD6cZJUwTkqB/sCFUbPuaeWI3dhx++rLXWWpmSwaVo2y4C6EyW+Q/AUkbfpP+FTfhrWV3WXHPNxEAEqyR1gNQJmqgUKgXbJ6slORF4L4yR+PDDD3urWvBt4w1AhyYpnb4RPBgAm9U2y4+LmkGeAmoGSfrdIjw85Gkbwo7A44MrL4sE0FkcCvwdIw5L3PXf0h+DyFJakxfcZAQS0B0NYQgCRAxIF9BJ9WzkYVDQCaCnnXZarbObXQE3Iu4sggK+6B/3BxjQ17vtEYBnpNMawjvE3+xSWSSAzuJQwO8Ya4SDSTSyHfG4uVAPWF3TCJ2ZlZ0EdttthuuKRHK2fqx+03oqBNBck3wLO2cXgxWDkuQa1BhD7AJs05SA+Zo/BrCg0ENIpSVt0xA2BLzN4iPH+wDNgoAh3JupUqOQFRj9180Swz3Gyh1iWOGuw+MAqOyAAjkDgA2vBAYe4EOVIBTskr1CL7roonqbdncGVCNUD7Z0/LrcGw8SbsY6gJk5TTbZZDoqaohsRHYWmk5mkQto5vf888/rtNHeTJUC2q0KNowjzE3fDdItQ4MS6Mn4q+0VioJa/iYrDRUCVQKVIg3Q+LLpJZHkcsOzAUgwmtji60Ru0hNBoSuvvNL7ELv3jR1iN+EB0GTt+RaAOs05614qBTQBFHRPsudc/RR9FEONSBvJ6SEZariZcPP5qrIxMskR8QEaFx8lXqg9RAhZgeuy6mYJzPyOWuWWopGZyNxC8icE0KGczjiOLZKynKS2XgRI8DQAtJBO+ng78Mcypp2PSyI6vm68GC6dccYZ2gcLoGlig082q2K7oOkXNgzJWG5nfIxBbIm0/BdzAwLowkShdGgafZSIlq+JC+oCSUWs5iH1aOi7rPoYnEavRr/k/3xVLhQS4PIC0AgW4y9Efy+QBR0P5ctnpnUwu01If2sBdMciaB0A3fSss87S6aEYcS6hgmBAEjBJqqJ2z0Fn5iF49tlndT4uxmMWoFmZES5GJud02xUXymZflBCXJqkEIb5xfOjw35Do0KGcTzkONxypjhTAog/7iEQh9GTSJEPAhkrDQ4K7DWPO17WHiCC+cNt1SCid3BICOyGAKGD6HQ1BlqKbs4H6hCoXUqrmNlZkJySPOiuHpqObruDkSo1C33xQF8jNwEhzy684HuOQEntKnUI7hRIeJ0qIP9aXPYYXBD0aQNj1d/iieYCIWNbdH8vuxRwMwSd2GTcCm4QhDHAS8A0BaCrByTLszdR1QBvm4QFh6ydxyKdXszqzUrOKEkAJ8YJkCea6667TuwPVLfZqTYCCcjCEHupGzLpW0b9THX/99df3DAt/yC2hs1QICaBDuNThMVQ7oC6gEvjq1/B68A4VVtYi/KXsDrj2uCYGpA1qAi34nVn1qJ5JKjTocMptn07fOPLJDcEb8ktIlgohAXQIlwo4hnwNvBC44Sixcgn9kGgWrjYijEUQeSV4XYgK2ioIuwDeEnI7cPNV2dIqbV54iXBvEqo2hFEH3whQhZAAOoRLBR1D0AXhEGRxE+rNJQA2OiSh6CJ8yFwT3ZnV2vZncz2AjUsMrwAVKSFGV0Gs8A6DVwj7AFXJEJFOXHbsYCFEqzC8QIZEhw7hWgfHoHIQ9cKap5LbR+i3rJ5UkhTRwBEVBEOJrZtG3a4uD5gpgiXfuKyXc4awjDxyAGmXgqEikZiU1dPOjO+mIQBoshgxinsz1cYo9DERnZZ2Axhu5Gj4XhWBIFitKMly6+vaFQyAwbjC7edWsbASoupgoBal8uS9T3hCEpbdUIaHGzsg1O3mAhodnFzzMt7IlXd+nRxfa0CbidF3A5cd2WBJRKibYAOVMEV4QNCl8RpQfZ70zhVUInaHqvNASHfFzWk3Fye6+sQTT+jmiiHkAzQ5MTwovZl6BaBhMHoj7zQhbzqp6ycqASmkBA2K6FiEykFuBAYqbkVXBcFVxgNENJPAT0juSRFgQRXDD233BcHfzs5CfWQICaBDuFTyMRS/0rgR4828LNO9JAYi0T5e+BOSdZZ1y4CYkDrjuV1RzbnsDujV+MgJApVNvAsQNcx+sKnYoQ1BSO4L9gluP7vJIw+jrNBlS84zPt4I3Gts9UmEz5hqDhL5fT2a89626ZlH4McU57pjcE3KwfCEkMZZJmG0osPb+j0Pr9vfJOke8BzRBo2MPUMC6DIlFjA2BhtbPe2wfDouPmMMybQKDPy5fEIjj1wH45M+HL5uTagguBvTXvYZMLXUQ7gH5k0xhE1Zr4G2j6UUDkDbPfEE0J1KpsPzESxlW+RO21unGZYVk9yQtIbjdO8k/E0jmdAmMRhiHI8u7xIVIxSpFqHqJLGHB5CMQjtTjmMJheO2CyEfoPGtU0dZdT/nkPvNc0yvMQp9k0K/ZZvFMreLWc2xWW8xRQ8njZKyf0AaQjw86Oju9s4DRHsG/OYhemzItXzHYAhiEGIY2kQk033PdtI1kgDN+XYDx3bvsZvn9WpAwzj0SFJP8Z+6nfSTGs0YhuOaI1RMMAXwhxh0ZLPRrNFVcwjsoF9TdFsm4XsmTRTXnU0UvWZ1nDLHY1yTVWerHFWoS2XyxYzdawENoEjOIbqFcKnwdhOaqOogZJ1GrGyE0PHr4j1J6wvC+ART7KQgMzbXQa8v2ydNdJDmOqTH2sQc2G1CCG8I7kbSdg0JoEM4V8IxrMi0w8X4YvtP60kX8r4+dHAMLAxDqqDTcq7JfaB3ni8TkIfKfatUCdPXzd1RsdhRbEJ379evX9AlMaS5V97CJYAOYlmxBwEg9F28FgQ5SPkk7yKLqN7Iyj7DY8F2jVcEPzIeBF99IddjVbNf/2CuT3opO0QVRK8QdgP37Vv4ykPf4SiArkJSnmvgc8ZTQUCDZHa7B0faLWGgodMOHDhQRw3TiD53qBCsbpRhJeU9AxhfRyIMQLwDoVlunbKS8D9NdeywN2NSHBxaZSOA7lQKOc/HWAPENCxHrUBYSa1u7aHxpbJKsSXjl+WFQVnvUOGhwWWVlsCPN4Wwu13yZK7LddjuQ0POOVkx2OHkaxBmd9UeeBbqXUkCND52quF7M9XGKMTIA7T4lrHWSd/MIpKQzHvyUC3olUwfjiKSk+xro2vin7Uja/yOIYUKRJVISAFv1nxCfscj42bE8dD63j+eNB45H3SMQh83xANNHgwh/t5MXQc0gQLcbbyJlK2bFdlXU2iYDFjJWwC49HBDn6TBSll9NXjQ6B2Nfu1W0BBAoY1Yla8u87UvoKrGfelSGigxKPv379/SF08A3eFjzJZJlTH5FmyjrBZp78Ez+RlY56gVpEmiM5a9MtJYkpcXkSvsEv+PZ6Ssh8nHYl/7AviBjh9KAuhQTgUch1rBtklyDVs5IE7KN2Y43Gn4iMmPQCfO0ncDbiHXIax8FOT6XjeMtwUdukpym5xzbVyJGLehJIAO5VTGceRNUAmCLprkdkMfpDkM6gS6IhZ9WrCjoFtrGQYPAlE0AiXkQ/tSVVFzzBu4yriHpDEJu7Or2cROgVoUSgLoUE5lHIc3gLRP2xixT2Hr5LVklFKhF1ZZjMouQfU3vaIJkrCFk7zkI1QMyp369u1bEGfCh8HD4b4plhwSXJShhM8cN6PdrUp06FDuWcdh7AEY1AffC9apMiGUHVoX18YteE9hBaZhI6scoDbvOUwaHz0ev3jZYW7f9aeaaqrBEqPwtFC8G0oY4Pjn7deCmLfghjaqCb1W1cd1xctBEg8pkL4VkFIifNCkfRbhfsvyM+PrZoVzX3PsEwT3Q8EAbcmoUCni/vIKHJXMbe2QJ4+D6/kAnbeVWN77rur4rgCayaWpHxha5PuSX5yH6FlHbgfJN2ynJPIAVF6f7OsTzUrMb24qpu+adEDF1QWQcdOFBjHy3H/WsewkvtZk2CZ53i4ggM7idBu/G/WDVlsA0CZccQgo7eXn6Lz4r8ltwHfNNxEwQE2tHT5jXG4k7vNw+N7dh9pDF1Lch0mEHk92G94FvB3dUDPMvREQ8bVAA6Do1qEkgA7lVBvHEZgg7dG35ROBoxiUlZQ2uXhHAC/fANjnSnNvgYcD/ZKWA66KQCstwOpGJTmOlrq8XYtOSnnA0gYLgk/h9XW8R8YmHlgSpvLYHRzPvO03iYnKESyG7APZMvF+2K2tOAtDhQAKK3iIjpt0JVZnAiDudg2QSRe13yTFGCT6E8AgYalql2Eat3xRQlo3kNbqvp4ibRziAKQJ2HWRAuhsnOY6gsbnGIpuWmSuQRIOpgqbnQBXoE34kQGtG9KmXx7+524YfWnz9UUJeUMBhQx5XseGpwnbQQBdBLpSxiCQAaOTem74TgV0rOTmY0LhqCMmeEPuB+8Qd7dlQO5LLwU4vOOlboS94dYN4g1ih/MZvdw/toYbiWWFhs92Cip8HDBggM5w7M3UNS9HEtMANXqzvVJjmJGAj8rAt/k3YXF81+Q+mw9NFDE4ccXZSff0nGbltcm34vE71dNUUdeNCHG71eakAzBXVA9clO7r8niwMZRtwv7gYXZ3JlSzpL4jdeNF0v3UDtDcKJE6VlR80vh9ERa6rPsB2L7EIPzbhINt4RMMwR2IgYk+TstcXi5k91g2TCLHBKDUjUgHcPv7sTPBA1ZY8mRC8saT5iWALlHiZptsR48FsBS/ko5qyB0nKSEKcGRFCkucdurQFBEkheOLuCcBdBFcLGEMtllcfqF9KuxbYBVk5a4bAWTeius2Yy/yPgXQRXKzwLFYfXnFhNtdyHcJdE6MULNik7TjK7Uq8PbaGorGNhi1NIkpiwTQZXG2gHFZyULKkjAg7cICjEzeglU3Qg0C1CHV7u3eO3kiIc122h2/ivNqaRRWMXG5RpwcEEDHKdfGzkoA3VjRxzlxAXSccm3srATQjRV9nBMXQMcp18bOSgDdWNHHOXEBdJxybeysBNCNFX2cExdAxynXxs5KAN1Y0cc5cQF0nHJt7KwE0I0VfZwTF0DHKdfGzkoA3VjRxzlxAXSccm3srATQjRV9nBMXQMcp18bOSgDdWNHHOXEBdJxybeysBNCNFX2cExdAxynXxs5KAN1Y0cc5cQF0nHJt7KwE0I0VfZwTF0DHKdfGzkoA3VjRxzlxAXSccm3srATQjRV9nBMXQMcp18bOSgDdWNHHOXEBdJxybeysBNCNFX2cExdAxynXxs5KAN1Y0cc5cQF0nHJt7KwE0I0VfZwTF0DHKdfGzkoA3VjRxzlxAXSccm3srATQjRV9nBMXQMcp18bOSgDdWNHHOXEBdJxybeysBNCNFX2cExdAxynXxs5KAN1Y0cc5cQF0nHJt7KwE0I0VfZwTF0DHKdfGzkoA3VjRxznx/wNeWG/VYZ3OMAAAAABJRU5ErkJggg=="""
@@ -25,34 +58,165 @@ DEFAULT_ICON_BYTES = base64.b64decode(DEFAULT_ICON_BASE64)
 async def list_themes(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=50, description="Items per page"),
-    search: Optional[str] = Query(None, description="Search term"),
+    search: Optional[str] = Query(None, description='Full-text search; supports "exact phrases" and -excluded words'),
     tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
-    author: Optional[str] = Query(None, description="Filter by author name")
+    author: Optional[str] = Query(None, description="Filter by author name"),
+    sort: str = Query("newest", pattern="^(newest|oldest|popular)$", description="Sort order"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor; pass an empty value for the first page"),
+    include_total: bool = Query(True, description="Count all matches (skip it for cheaper pages)")
 ):
     """Get themes with pagination and filtering."""
     try:
         skip = (page - 1) * limit
         tag_list = [tag.strip() for tag in tags.split(",")] if tags else None
         
-        result = get_themes(
+        result = await get_themes(
             skip=skip, 
             limit=limit, 
             search=search, 
             tags=tag_list,
-            author=author
+            author=author,
+            sort=sort,
+            cursor=cursor,
+            include_total=include_total
         )
         
-        return ThemeListResponse(
-            themes=result["themes"],
-            total=result["total"],
-            page=result["page"],
-            limit=result["limit"]
-        )
+        # Built from our own documents: skip response_model re-validation
+        return JSONBytesResponse(dump_json(result))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting themes: {e}")
         raise HTTPException(status_code=500, detail="Failed to get themes")
 
 
+@theme_router.get("/search", response_model=ThemeSearchResponse)
+async def search_themes_with_facets(
+    page: int = Query(1, ge=1, description="Page number"),
+    limit: int = Query(10, ge=1, le=50, description="Items per page"),
+    search: Optional[str] = Query(None, description='Full-text search; supports "exact phrases" and -excluded words'),
+    tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
+    author: Optional[str] = Query(None, description="Filter by author name"),
+    sort: str = Query("newest", pattern="^(newest|oldest|popular)$", description="Sort order when not searching"),
+    facet_limit: int = Query(20, ge=1, le=100, description="Values returned per facet")
+):
+    """Get a page of themes with the total and tag/author facet counts for the filter."""
+    try:
+        tag_list = [tag.strip() for tag in tags.split(",")] if tags else None
+        result = await search_themes(
+            skip=(page - 1) * limit,
+            limit=limit,
+            search=search,
+            tags=tag_list,
+            author=author,
+            sort=sort,
+            facet_limit=facet_limit
+        )
+        return JSONBytesResponse(dump_json(result))
+    except Exception as e:
+        logger.error(f"Error searching themes: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search themes")
+
+
+@theme_router.get("/suggest", response_model=SuggestionResponse)
+async def suggest_themes(
+    q: str = Query(..., min_length=1, max_length=100, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=25, description="Number of suggestions"),
+    kinds: Optional[str] = Query(None, description=f"Comma-separated subset of {', '.join(SUGGESTION_KINDS)}")
+):
+    """Autocomplete theme names, tags and authors by prefix, most downloaded first."""
+    kind_list = [kind.strip() for kind in kinds.split(",") if kind.strip()] if kinds else None
+    if kind_list and not set(kind_list) <= set(SUGGESTION_KINDS):
+        raise HTTPException(status_code=400, detail=f"kinds must be among {', '.join(SUGGESTION_KINDS)}")
+    return JSONBytesResponse(dump_json({"suggestions": suggestion_index.suggest(q, limit, kind_list)}))
+
+
+@theme_router.get("/tags", response_model=TagListResponse)
+async def list_tags(limit: Optional[int] = Query(None, ge=1, le=1000, description="Return only the most used tags")):
+    """Get tags with the number of themes using each, most used first."""
+    try:
+        return TagListResponse(tags=await get_tag_stats(limit))
+    except Exception as e:
+        logger.error(f"Error getting tags: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get tags")
+
+
+@theme_router.get("/popular", response_model=TrendingResponse)
+async def list_popular_themes(limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE, description="Number of themes")):
+    """Get the most downloaded themes of all time."""
+    try:
+        return TrendingResponse(window="all", themes=await get_trending_themes("all", limit))
+    except Exception as e:
+        logger.error(f"Error getting popular themes: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get popular themes")
+
+
+@theme_router.get("/trending", response_model=TrendingResponse)
+async def list_trending_themes(
+    window: str = Query("24h", pattern="^(24h|7d|all)$", description="Trending window"),
+    limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE, description="Number of themes")
+):
+    """Get the themes trending in a window, ranked by time-decayed downloads."""
+    try:
+        return TrendingResponse(window=window, themes=await get_trending_themes(window, limit))
+    except Exception as e:
+        logger.error(f"Error getting trending themes: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get trending themes")
+
+
+async def batch_response(ids: List[int], summary: bool) -> ThemeBatchResponse:
+    if len(ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    try:
+        themes, missing = await get_themes_batch(ids, summary)
+        return ThemeBatchResponse(themes=themes, missing=missing)
+    except Exception as e:
+        logger.error(f"Error getting themes batch: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get themes")
+
+
+@theme_router.get("/batch", response_model=ThemeBatchResponse)
+async def get_themes_by_ids(
+    ids: str = Query(..., description="Comma-separated integer theme IDs"),
+    summary: bool = Query(True, description="Return card-sized summaries instead of full themes")
+):
+    """Get several themes at once, in the order requested."""
+    try:
+        id_list = [int(theme_id) for theme_id in ids.split(",") if theme_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not id_list:
+        raise HTTPException(status_code=400, detail="No ids given")
+    return await batch_response(id_list, summary)
+
+
+@theme_router.post("/batch", response_model=ThemeBatchResponse)
+async def post_themes_by_ids(request: ThemeBatchRequest):
+    """Get several themes at once; for ID lists too long for a query string."""
+    return await batch_response(request.ids, request.summary)
+
+
+async def user_themes_response(user_id: str, limit: int, cursor: Optional[str]) -> ThemeListResponse:
+    try:
+        result = await get_themes_by_user(user_id, limit=limit, cursor=cursor)
+        return ThemeListResponse(**result)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting themes of user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get themes")
+
+
+@theme_router.get("/by-user/{user_id}", response_model=ThemeListResponse)
+async def list_user_themes(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=50, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor")
+):
+    """Get a user's themes, newest first, one page at a time."""
+    return await user_themes_response(user_id, limit, cursor)
+
+
 @theme_router.post("/upload", response_model=ThemeResponse)
 async def upload_theme(
     name: str = Form(...),
@@ -110,23 +274,19 @@ async def upload_theme(
                 BGM Info: {bgm_info}
                 """.encode('utf-8')
 
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            zip_file.writestr('body_LZ.bin', body_lz_content)
-            zip_file.writestr('bgm.bcstm', bgm_content)
-            zip_file.writestr('preview.png', preview_content)
-            zip_file.writestr('icon.png', icon_content)
-            zip_file.writestr('info.smdh', smdh_content)
-        
-        zip_buffer.seek(0)
-
-        # Store ZIP file in GridFS
-        zip_file_id = store_file(zip_buffer.getvalue(), f"{name}.zip", "application/zip")
-
-        # Encode images as base64 for preview
-        preview_b64 = base64.b64encode(preview_content).decode('utf-8')
-        icon_b64 = base64.b64encode(icon_content).decode('utf-8')
+        # Store each ZIP member on its own, stored or deflated by what it contains;
+        # files other themes already use (e.g. the default icon) are not stored again
+        zip_manifest, zip_metrics = await store_theme_zip([
+            ('body_LZ.bin', body_lz_content),
+            ('bgm.bcstm', bgm_content),
+            ('preview.png', preview_content),
+            ('icon.png', icon_content),
+            ('info.smdh', smdh_content)
+        ])
+        zip_build_stats.record(zip_metrics)
+        logger.info("Stored theme ZIP members for %r: %s", name, ", ".join(
+            f"{m['name']} {m['method']} {m['ratio']:.2f} in {m['cpu_seconds'] * 1000:.1f}ms" for m in zip_metrics
+        ))
 
         # Create theme data
         theme_data = ThemeCreate(
@@ -137,19 +297,28 @@ async def upload_theme(
             tags=tag_list
         )
 
-        # Create theme in database
+        # Create theme in database; images are stored outside the document
         extra_fields = {
-            'preview_b64': preview_b64,
-            'icon_b64': icon_b64,
             'bgm_info': bgm_info
         }
 
-        theme = create_theme(
-            theme_data=theme_data,
-            user_id=current_user.id,
-            zip_file_id=str(zip_file_id),
-            extra_fields=extra_fields
-        )
+        try:
+            theme = await create_theme(
+                theme_data=theme_data,
+                user_id=current_user.id,
+                extra_fields=extra_fields,
+                images={'preview': preview_content, 'icon': icon_content},
+                zip_manifest=zip_manifest
+            )
+        except Exception:
+            await release_theme_zip(zip_manifest)
+            raise
+
+        # Resized previews are a nice-to-have; the original still serves without them
+        try:
+            await store_preview_variants(theme.theme_id, preview_content)
+        except Exception as e:
+            logger.error(f"Error generating preview variants for theme {theme.theme_id}: {e}")
         return theme
 
     except Exception as e:
@@ -159,37 +328,162 @@ async def upload_theme(
 
 @theme_router.get("/{theme_id}", response_model=ThemeResponse)
 async def get_theme_by_id(theme_id: int):
-    theme = get_theme(theme_id)
+    theme = await get_theme(theme_id)
     if not theme:
         raise HTTPException(status_code=404, detail="Theme not found")
-    return theme
+    return JSONBytesResponse(dump_json(theme))
+
+
+async def theme_image_response(theme_id: int, kind: str, if_none_match: Optional[str], variant: str = ORIGINAL_VARIANT) -> Response:
+    image = await get_theme_image(theme_id, kind, variant)
+    # Uploaded images never change, so clients may cache them forever
+    cache_control = IMMUTABLE_CACHE_CONTROL
+    if image is None and variant != ORIGINAL_VARIANT:
+        # Not generated yet (e.g. before a backfill); fall back to the original,
+        # briefly cached so clients pick up the variant once it exists
+        image = await get_theme_image(theme_id, kind)
+        cache_control = FALLBACK_CACHE_CONTROL
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers = {
+        "ETag": make_etag(image["sha256"]),
+        "Cache-Control": cache_control
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image["data"], media_type=image["content_type"], headers=headers)
+
+
+@theme_router.get("/{theme_id}/preview", response_class=Response, responses={200: {"content": {"image/png": {}}}})
+async def get_theme_preview(
+    theme_id: int,
+    size: Optional[int] = Query(None, description=f"Resized variant width, one of {VARIANT_WIDTHS}"),
+    format: str = Query("png", pattern="^(png|webp)$", description="Variant image format"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Serve a theme's preview image, or one of its resized variants."""
+    if size is None:
+        return await theme_image_response(theme_id, "preview", if_none_match)
+    if size not in VARIANT_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"size must be one of {list(VARIANT_WIDTHS)}")
+    return await theme_image_response(theme_id, "preview", if_none_match, variant_name(size, format))
+
+
+@theme_router.get("/{theme_id}/icon", response_class=Response, responses={200: {"content": {"image/png": {}}}})
+async def get_theme_icon(theme_id: int, if_none_match: Optional[str] = Header(None)):
+    """Serve a theme's icon image."""
+    return await theme_image_response(theme_id, "icon", if_none_match)
+
+
+def byterange_part_header(boundary: str, content_type: str, start: int, end: int, length: int) -> bytes:
+    return (
+        f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{length}\r\n\r\n"
+    ).encode()
+
+
+async def iter_byteranges(file_obj, ranges: List[Tuple[int, int]], boundary: str, content_type: str) -> AsyncIterator[bytes]:
+    """Yield a ``multipart/byteranges`` body for several ranges of one file, then close it."""
+    try:
+        for start, end in ranges:
+            yield byterange_part_header(boundary, content_type, start, end, file_obj.length)
+            async for chunk in iter_file_range(file_obj, start, end, close=False):
+                yield chunk
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode()
+    finally:
+        await file_obj.close()
+
+
+def byteranges_length(ranges: List[Tuple[int, int]], boundary: str, content_type: str, length: int) -> int:
+    """Exact size of the body ``iter_byteranges`` produces."""
+    total = len(f"--{boundary}--\r\n")
+    for start, end in ranges:
+        total += len(byterange_part_header(boundary, content_type, start, end, length)) + (end - start + 1) + 2
+    return total
 
 
 @theme_router.get("/download/{id}")
-def download_theme_by_id(id: int):
-    """Download theme by ID."""
+async def download_theme_by_id(
+    id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """Download theme by ID.
+
+    Supports single and multiple byte ranges (206, or 416 when none overlap
+    the file) and revalidation via ``If-None-Match``/``If-Modified-Since``
+    (304). The ETag is the ZIP's content digest.
+    """
     try:
         # Find theme by integer ID
-        theme = get_theme(id)
+        theme = await get_theme(id)
         if not theme:
             raise HTTPException(status_code=404, detail="Theme not found")
         
-        # Get ZIP file from GridFS
-        if not theme.zip_file_id:
+        # Assembled from the theme's members (hot ones from the in-process cache), or a ZIP stored whole
+        try:
+            file_obj = await open_theme_zip(theme)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Theme ZIP file not found")
-        
-        file_obj = get_file(ObjectId(theme.zip_file_id))
         filename = f"{theme.name or 'theme'} by {theme.author_name or 'switch theme'}.zip"
-        
-        # Increment download count
-        increment_download_count(ObjectId(theme.id))
-        
+        length = file_obj.length
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Accept-Ranges": "bytes",
+            "ETag": make_etag(get_file_digest(file_obj))
+        }
+        if file_obj.upload_date:
+            headers["Last-Modified"] = format_http_date(file_obj.upload_date)
+
+        if is_not_modified(if_none_match, if_modified_since, headers["ETag"], file_obj.upload_date):
+            await file_obj.close()
+            return Response(status_code=304, headers=headers)
+
+        ranges = None
+        if if_range_matches(if_range, headers["ETag"], file_obj.upload_date):
+            try:
+                ranges = parse_range(range_header, length)
+            except RangeNotSatisfiable:
+                await file_obj.close()
+                headers["Content-Range"] = f"bytes */{length}"
+                return Response(status_code=416, headers=headers)
+
+        # Count the download once, not again for every resumed range; written to the database in batches
+        if ranges is None or ranges[0][0] == 0:
+            download_counter.record(theme.theme_id)
+
+        if ranges is None and range_header is None and isinstance(file_obj, LocalFile):
+            # Local storage: let the server send the file itself (sendfile/pathsend where supported).
+            # Only without a Range header, which FileResponse would otherwise interpret on its own
+            await file_obj.close()
+            return FileResponse(file_obj.path, media_type="application/zip", headers=headers)
+
+        if ranges is None:
+            # Stream stored chunks as they are read; only one chunk is in memory at a time
+            headers["Content-Length"] = str(length)
+            return StreamingResponse(iter_file_chunks(file_obj), media_type="application/zip", headers=headers)
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file_range(file_obj, start, end),
+                status_code=206,
+                media_type="application/zip",
+                headers=headers
+            )
+
+        boundary = secrets.token_hex(16)
+        headers["Content-Length"] = str(byteranges_length(ranges, boundary, "application/zip", length))
         return StreamingResponse(
-            io.BytesIO(file_obj.read()),
-            media_type="application/zip",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
+            iter_byteranges(file_obj, ranges, boundary, "application/zip"),
+            status_code=206,
+            media_type=f"multipart/byteranges; boundary={boundary}",
+            headers=headers
         )
     except HTTPException:
         raise
@@ -198,6 +492,90 @@ def download_theme_by_id(id: int):
         raise HTTPException(status_code=500, detail="Failed to download theme")
 
 
+def bundle_entry_name(theme: ThemeResponse) -> str:
+    """Unique, path-safe name for a theme inside a bundle."""
+    name = f"{theme.theme_id} - {theme.name or 'theme'} by {theme.author_name or 'switch theme'}"
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", name).strip(" .")
+
+
+async def iter_bundle(entries: List[Tuple[str, object]], layout: str) -> AsyncIterator[bytes]:
+    """Yield a ZIP of the given open theme files, built as they are read.
+
+    ``layout`` "zip" nests each theme ZIP as-is (stored, not recompressed);
+    "folders" unpacks each theme into its own folder, holding one theme ZIP
+    in memory at a time; inflating and deflating run in a worker thread.
+    Every file is closed when done.
+    """
+    bundle = StreamingZipWriter()
+    try:
+        for name, file_obj in entries:
+            if layout == "zip":
+                with bundle.open(f"{name}.zip", file_obj.length) as member:
+                    async for chunk in iter_file_chunks(file_obj):
+                        member.write(chunk)
+                        yield bundle.drain()
+                yield bundle.drain()
+            else:
+                theme_zip = b"".join([chunk async for chunk in iter_file_chunks(file_obj)])
+                with zipfile.ZipFile(io.BytesIO(theme_zip)) as archive:
+                    for info in archive.infolist():
+                        # Members keep the method chosen at upload
+                        await asyncio.to_thread(bundle.copy, f"{name}/{info.filename}", archive, info)
+                        yield bundle.drain()
+        yield bundle.close()
+    finally:
+        for _, file_obj in entries:
+            await file_obj.close()
+
+
+@theme_router.post("/bundle")
+async def download_theme_bundle(request: ThemeBundleRequest):
+    """Download several themes as one ZIP, streamed as it is built.
+
+    Missing themes, and themes without a ZIP, are skipped and listed in
+    ``X-Missing-Theme-Ids``. The theme ZIPs together, or for the folders
+    layout the files inside them, may not exceed ``BUNDLE_MAX_BYTES``.
+    """
+    if len(request.theme_ids) > BUNDLE_MAX_THEMES:
+        raise HTTPException(status_code=400, detail=f"At most {BUNDLE_MAX_THEMES} themes per bundle")
+    entries = []
+    try:
+        found, missing = await get_themes_batch(request.theme_ids, summary=False)
+        # Opening reads only metadata, which gives the total size before anything is sent
+        themes = []
+        for theme in found:
+            try:
+                entries.append((bundle_entry_name(theme), await open_theme_zip(theme)))
+                themes.append(theme)
+            except FileNotFoundError:
+                missing.append(theme.theme_id)
+        if not themes:
+            raise HTTPException(status_code=404, detail="None of the themes were found")
+        if request.layout == "folders":
+            # Every member is inflated on the way through, so limit what is unpacked
+            total = sum([await get_zip_content_size(file_obj) for _, file_obj in entries])
+        else:
+            total = sum(file_obj.length for _, file_obj in entries)
+        if total > BUNDLE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Bundle would be {total} bytes; the limit is {BUNDLE_MAX_BYTES}")
+    except Exception as e:
+        for _, file_obj in entries:
+            await file_obj.close()
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Error preparing theme bundle: {e}")
+        raise HTTPException(status_code=500, detail="Failed to download themes")
+
+    # Count the downloads; written to the database in batches
+    for theme in themes:
+        download_counter.record(theme.theme_id)
+
+    headers = {"Content-Disposition": "attachment; filename=themes.zip"}
+    if missing:
+        headers["X-Missing-Theme-Ids"] = ",".join(str(theme_id) for theme_id in missing)
+    return StreamingResponse(iter_bundle(entries, request.layout), media_type="application/zip", headers=headers)
+
+
 # High Priority Routes - Theme Management
 
 @theme_router.put("/{theme_id}", response_model=ThemeResponse)
@@ -209,7 +587,7 @@ async def update_theme_by_id(
     """Update a theme by ID (only theme owner can update)."""
     try:
         # Get the theme first
-        theme = get_theme(theme_id)
+        theme = await get_theme(theme_id)
         if not theme:
             raise HTTPException(status_code=404, detail="Theme not found")
         
@@ -218,7 +596,7 @@ async def update_theme_by_id(
             raise HTTPException(status_code=403, detail="You can only update your own themes")
         
         # Update the theme
-        updated_theme = update_theme(ObjectId(theme.id), theme_data)
+        updated_theme = await update_theme(ObjectId(theme.id), theme_data)
         if not updated_theme:
             raise HTTPException(status_code=500, detail="Failed to update theme")
         
@@ -238,7 +616,7 @@ async def delete_theme_by_id(
     """Delete a theme by ID (only theme owner can delete)."""
     try:
         # Get the theme first
-        theme = get_theme(theme_id)
+        theme = await get_theme(theme_id)
         if not theme:
             raise HTTPException(status_code=404, detail="Theme not found")
         
@@ -247,7 +625,7 @@ async def delete_theme_by_id(
             raise HTTPException(status_code=403, detail="You can only delete your own themes")
         
         # Delete the theme
-        success = delete_theme(ObjectId(theme.id))
+        success = await delete_theme(ObjectId(theme.id))
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete theme")
         
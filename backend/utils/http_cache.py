@@ -0,0 +1,130 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+# Content under a URL that never changes, e.g. an uploaded theme's images
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Stand-in content that will be replaced under the same URL, e.g. an original
+# image served until its resized variant has been generated
+FALLBACK_CACHE_CONTROL = "public, max-age=300"
+
+
+def make_etag(digest: str) -> str:
+    """Strong entity tag for a content digest."""
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison, RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a ``Range`` header is valid but selects no bytes of the resource."""
+
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 16
+
+
+def format_http_date(value: datetime) -> str:
+    """IMF-fixdate for a naive UTC or aware datetime."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an HTTP date header to an aware UTC datetime; None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    since = parse_http_date(if_modified_since)
+    if since is None:
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether a GET can be answered with 304 (RFC 9110 section 13.2.2).
+
+    ``If-Modified-Since`` is only considered when there is no ``If-None-Match``.
+    """
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    return last_modified is not None and _not_modified_since(if_modified_since, last_modified)
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether a ``Range`` may be honoured given ``If-Range`` (strong comparison)."""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not if_range.startswith("W/") and if_range == etag
+    since = parse_http_date(if_range)
+    if since is None or last_modified is None:
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) == since
+
+
+def parse_range(header: Optional[str], length: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a ``Range`` header into inclusive ``(start, end)`` byte ranges.
+
+    Returns None when the header is absent, malformed, not in bytes or asks
+    for too many ranges; the whole file should then be sent. Raises
+    ``RangeNotSatisfiable`` when no requested range overlaps the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    parts = [part.strip() for part in spec.split(",")]
+    if len(parts) > MAX_RANGES:
+        return None
+    ranges = []
+    for part in parts:
+        first, dash, last = part.partition("-")
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else max(start, length - 1)
+                if start < 0 or end < start:
+                    return None
+            else:
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix == 0:
+                    continue
+                start, end = max(0, length - suffix), length - 1
+        except ValueError:
+            return None
+        if start < length:
+            ranges.append((start, min(end, length - 1)))
+    if not ranges:
+        raise RangeNotSatisfiable(f"No requested range overlaps {length} bytes")
+    return ranges
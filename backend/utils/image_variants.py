@@ -0,0 +1,49 @@
+from typing import Dict, Tuple
+from PIL import Image
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Widths and formats generated for every preview image
+VARIANT_WIDTHS = (160, 400)
+VARIANT_FORMATS = {
+    "webp": "image/webp",
+    "png": "image/png",
+}
+
+
+def variant_name(width: int, image_format: str) -> str:
+    return f"{width}.{image_format}"
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        image.save(buffer, format="WEBP", lossless=True, quality=100, method=6)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(image_data: bytes) -> Dict[str, Tuple[bytes, str]]:
+    """Resize an image to every variant width and encode it losslessly in each format.
+
+    Returns ``{variant name: (bytes, content type)}``. Images narrower than a
+    variant are re-encoded at their own size, never upscaled. This is CPU
+    bound; call it from a worker thread or process.
+    """
+    with Image.open(io.BytesIO(image_data)) as original:
+        original.load()
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA")
+        variants = {}
+        for width in VARIANT_WIDTHS:
+            if original.width > width:
+                height = max(1, round(original.height * width / original.width))
+                resized = original.resize((width, height), Image.Resampling.LANCZOS)
+            else:
+                resized = original
+            for image_format, content_type in VARIANT_FORMATS.items():
+                variants[variant_name(width, image_format)] = (_encode(resized, image_format), content_type)
+        return variants
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Tuple
+from datetime import datetime
+from bson import ObjectId
+import base64
+import json
+
+# Sort orders available to keyset pagination: name -> (field, direction).
+# Every order is tie-broken on _id in the same direction so keys are unique.
+SORT_KEYS: Dict[str, Tuple[str, int]] = {
+    "newest": ("created_at", -1),
+    "oldest": ("created_at", 1),
+    "popular": ("download_count", -1),
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or doesn't match the sort."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort: str, doc: Dict[str, Any]) -> str:
+    """Build an opaque cursor pointing just after ``doc`` in ``sort`` order."""
+    field, _ = SORT_KEYS[sort]
+    payload = {"s": sort, "v": _encode_value(doc.get(field)), "id": str(doc["_id"])}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, ObjectId]:
+    """Return the ``(sort value, _id)`` a cursor points after."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        value, last_id = _decode_value(payload["v"]), ObjectId(payload["id"])
+    except Exception as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if payload.get("s") != sort:
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    return value, last_id
+
+
+def keyset_filter(sort: str, cursor: str) -> Dict[str, Any]:
+    """Query clause selecting the documents after ``cursor`` in ``sort`` order."""
+    field, direction = SORT_KEYS[sort]
+    value, last_id = decode_cursor(cursor, sort)
+    op = "$lt" if direction < 0 else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: last_id}},
+    ]}
+
+
+def keyset_sort(sort: str) -> List[Tuple[str, int]]:
+    """Sort specification matching ``keyset_filter`` for ``sort``."""
+    field, direction = SORT_KEYS[sort]
+    return [(field, direction), ("_id", direction)]
@@ -0,0 +1,73 @@
+from functools import lru_cache
+from typing import Any, Dict, Tuple, Type, TypeVar
+from fastapi.responses import Response
+from pydantic import BaseModel
+import orjson
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# The helpers below handle flat models without custom validators or
+# serializers, which is what the theme models are. They read and write the
+# model's __dict__ directly; pydantic's own model_construct/model_dump are
+# several times slower for these shapes.
+
+
+@lru_cache(maxsize=None)
+def _field_plan(model: Type[BaseModel]) -> Tuple[Tuple[str, str, Any], ...]:
+    return tuple((name, field.alias or name, field) for name, field in model.model_fields.items())
+
+
+@lru_cache(maxsize=None)
+def _computed_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
+    return tuple(model.model_computed_fields)
+
+
+def construct_trusted(model: Type[ModelT], doc: Dict[str, Any]) -> ModelT:
+    """Build ``model`` from a document we wrote ourselves, without validating it.
+
+    Fields are read by alias or by name; missing ones get their defaults and
+    unknown keys are dropped.
+    """
+    values = {}
+    for name, alias, field in _field_plan(model):
+        if alias in doc:
+            values[name] = doc[alias]
+        elif name in doc:
+            values[name] = doc[name]
+        elif not field.is_required():
+            values[name] = field.get_default(call_default_factory=True)
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        model = type(obj)
+        values = obj.__dict__
+        content = {alias: values[name] for name, alias, _ in _field_plan(model) if name in values}
+        for name in _computed_fields(model):
+            content[name] = getattr(obj, name)
+        return content
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dump_json(content: Any) -> bytes:
+    """Encode content (dicts, lists and models, nested freely) to JSON bytes.
+
+    Models are written by alias with their computed fields, as FastAPI
+    would send them for a ``response_model``.
+    """
+    return orjson.dumps(content, default=_default)
+
+
+class JSONBytesResponse(Response):
+    """Response for a body that is already encoded JSON.
+
+    Returning it from a route skips FastAPI's ``response_model`` validation and
+    encoding; only use it for data built from our own documents.
+    """
+    media_type = "application/json"
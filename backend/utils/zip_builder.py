@@ -0,0 +1,236 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import io
+import logging
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Timestamp written for every member (the earliest ZIP date), so the same
+# members always make byte-identical archives
+ZIP_MEMBER_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Members that are already compressed; deflating them costs CPU for nothing
+STORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp", ".zip", "_lz.bin")
+
+# Bytes sampled by the compressibility probe, and the ratio above which a
+# member is stored rather than deflated
+PROBE_BYTES = 64 * 1024
+PROBE_MAX_RATIO = 0.9
+
+DEFAULT_COMPRESSION_LEVEL = int(os.getenv("ZIP_COMPRESSION_LEVEL", "6"))
+
+# Header layouts for archives assembled by ``zip_layout``: version 2.0
+# (deflate, no ZIP64), made on Unix, members readable by everyone
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+ZIP_VERSION = 20
+ZIP_CREATE_SYSTEM = 3
+ZIP_MEMBER_ATTRIBUTES = 0o644 << 16
+ZIP_UTF8_FLAG = 0x800
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP_METHODS = {"stored": zipfile.ZIP_STORED, "deflated": zipfile.ZIP_DEFLATED}
+
+
+def choose_compression(name: str, data: bytes) -> Tuple[int, str]:
+    """Pick ``ZIP_STORED`` or ``ZIP_DEFLATED`` for one member, with the reason.
+
+    Known pre-compressed types are stored outright. Everything else is
+    probed by deflating a sample at the fastest level; data that doesn't get
+    meaningfully smaller is stored.
+    """
+    if name.lower().endswith(STORED_SUFFIXES):
+        return zipfile.ZIP_STORED, "type"
+    if len(data) < 64:
+        return zipfile.ZIP_STORED, "small"
+    sample = data[:PROBE_BYTES]
+    if len(zlib.compress(sample, 1)) / len(sample) > PROBE_MAX_RATIO:
+        return zipfile.ZIP_STORED, "probe"
+    return zipfile.ZIP_DEFLATED, "probe"
+
+
+def compress_member(name: str, data: bytes, compression_level: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """Encode one member the way it is laid out in a ZIP, choosing the method.
+
+    Returns the payload (raw deflate stream, or the bytes themselves) and a
+    metrics dict: name, method, reason, size, compressed_size, crc, ratio and
+    the CPU seconds spent. Deflating that saves nothing falls back to storing.
+    This is CPU bound; call it from a worker thread.
+    """
+    level = DEFAULT_COMPRESSION_LEVEL if compression_level is None else compression_level
+    started = time.thread_time()
+    method, reason = choose_compression(name, data)
+    payload = data
+    if method == zipfile.ZIP_DEFLATED:
+        # Same raw stream zipfile writes, so identical bytes always encode identically
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+        if len(payload) >= len(data):
+            method, reason, payload = zipfile.ZIP_STORED, "larger", data
+    return payload, {
+        "name": name,
+        "method": "deflated" if method == zipfile.ZIP_DEFLATED else "stored",
+        "reason": reason,
+        "size": len(data),
+        "compressed_size": len(payload),
+        "crc": zlib.crc32(data),
+        "ratio": len(payload) / len(data) if data else 1.0,
+        "cpu_seconds": time.thread_time() - started
+    }
+
+
+def _dos_date_time() -> Tuple[int, int]:
+    year, month, day, hour, minute, second = ZIP_MEMBER_DATE_TIME
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def zip_layout(members: Sequence[Dict[str, Any]]) -> Tuple[List[Union[bytes, int]], int]:
+    """Lay out a ZIP around member payloads that are kept elsewhere.
+
+    ``members`` are dicts with name, method ("stored" or "deflated"), crc,
+    size and compressed_size, as ``compress_member`` reports them. Returns
+    the pieces of the archive in order (header bytes, or the index of the
+    member whose payload goes there) and its total length. The same members
+    always give the same bytes. Archives that would need ZIP64 are refused.
+    """
+    date, time_of_day = _dos_date_time()
+    pieces: List[Union[bytes, int]] = []
+    directory = []
+    offset = 0
+    for index, member in enumerate(members):
+        try:
+            name, flags = member["name"].encode("ascii"), 0
+        except UnicodeEncodeError:
+            name, flags = member["name"].encode("utf-8"), ZIP_UTF8_FLAG
+        method = ZIP_METHODS[member["method"]]
+        if max(offset, member["size"], member["compressed_size"]) > ZIP32_LIMIT:
+            raise ValueError(f"{member['name']} would need ZIP64, which assembled archives don't support")
+        fields = (flags, method, time_of_day, date, member["crc"], member["compressed_size"], member["size"], len(name))
+        header = LOCAL_HEADER.pack(b"PK\x03\x04", ZIP_VERSION, *fields, 0) + name
+        directory.append(
+            CENTRAL_HEADER.pack(b"PK\x01\x02", ZIP_VERSION, ZIP_CREATE_SYSTEM, ZIP_VERSION, 0, *fields, 0, 0, 0, 0, ZIP_MEMBER_ATTRIBUTES, offset) + name
+        )
+        pieces.extend((header, index))
+        offset += len(header) + member["compressed_size"]
+    directory_bytes = b"".join(directory)
+    if offset + len(directory_bytes) > ZIP32_LIMIT or len(members) > 0xFFFF:
+        raise ValueError("Archive would need ZIP64, which assembled archives don't support")
+    pieces.append(directory_bytes + END_RECORD.pack(b"PK\x05\x06", 0, 0, len(members), len(members), len(directory_bytes), offset, 0))
+    return pieces, offset + len(pieces[-1])
+
+
+def parse_end_record(data: bytes) -> Tuple[int, int]:
+    """Entry count and central directory size from the last bytes of a ZIP without comment."""
+    if len(data) != END_RECORD.size or not data.startswith(b"PK\x05\x06"):
+        raise ValueError("No ZIP end record where expected")
+    _, _, _, _, entries, directory_size, _, _ = END_RECORD.unpack(data)
+    return entries, directory_size
+
+
+def uncompressed_total(directory: bytes, entries: int) -> int:
+    """Sum of the uncompressed member sizes listed in a ZIP central directory."""
+    total = 0
+    position = 0
+    for _ in range(entries):
+        fields = CENTRAL_HEADER.unpack_from(directory, position)
+        if fields[0] != b"PK\x01\x02":
+            raise ValueError("Malformed ZIP central directory")
+        total += fields[11]
+        position += CENTRAL_HEADER.size + fields[12] + fields[13] + fields[14]
+    return total
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable stream whose output is taken with ``drain``."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class StreamingZipWriter:
+    """Builds a ZIP incrementally, handing out the bytes written so far.
+
+    The output is unseekable, so member sizes and CRCs follow each member in
+    a data descriptor and nothing but the pending output is buffered. Call
+    ``drain`` after each write and ``close`` once for the central directory.
+    """
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._archive = zipfile.ZipFile(self._sink, "w")
+
+    def _info(self, name: str, size: int, method: int) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, date_time=ZIP_MEMBER_DATE_TIME)
+        info.external_attr = ZIP_MEMBER_ATTRIBUTES
+        info.compress_type = method
+        # A known size lets zipfile decide up front whether ZIP64 is needed
+        info.file_size = size
+        return info
+
+    def open(self, name: str, size: int, method: int = zipfile.ZIP_STORED):
+        """Open a member of ``size`` bytes for writing in pieces."""
+        return self._archive.open(self._info(name, size, method), "w")
+
+    def write(self, name: str, data: bytes, method: int = zipfile.ZIP_STORED, compression_level: Optional[int] = None):
+        """Add a whole member at once."""
+        self._archive.writestr(self._info(name, len(data), method), data, method, compression_level)
+
+    def copy(self, name: str, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Add a member of another archive under ``name``, keeping its compression method."""
+        self.write(name, archive.read(info), info.compress_type)
+
+    def drain(self) -> bytes:
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """Finish the archive; returns the remaining output."""
+        self._archive.close()
+        return self._sink.drain()
+
+
+class ZipBuildStats:
+    """Per-member totals of the theme ZIPs encoded in this worker, by member name."""
+
+    def __init__(self):
+        self.builds = 0
+        self._members: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, metrics: List[Dict[str, Any]]):
+        self.builds += 1
+        for member in metrics:
+            totals = self._members.setdefault(member["name"], {
+                "count": 0, "stored": 0, "deflated": 0, "size": 0, "compressed_size": 0, "cpu_seconds": 0.0
+            })
+            totals["count"] += 1
+            totals[member["method"]] += 1
+            totals["size"] += member["size"]
+            totals["compressed_size"] += member["compressed_size"]
+            totals["cpu_seconds"] += member["cpu_seconds"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "members": {
+                name: {**totals, "ratio": totals["compressed_size"] / totals["size"] if totals["size"] else 1.0}
+                for name, totals in self._members.items()
+            }
+        }
+
+
+zip_build_stats = ZipBuildStats()
@@ -1,7 +1,19 @@
 import type { NextConfig } from "next";
 
+const apiUrl = new URL(process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000");
+
 const nextConfig: NextConfig = {
-  /* config options here */
+  images: {
+    // Theme previews and icons are served by the API
+    remotePatterns: [
+      {
+        protocol: apiUrl.protocol === "https:" ? "https" : "http",
+        hostname: apiUrl.hostname,
+        port: apiUrl.port,
+        pathname: "/themes/**",
+      },
+    ],
+  },
 };
 
 export default nextConfig;
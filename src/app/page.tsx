@@ -52,7 +52,7 @@ export default async function HomePage() {
         {/* ImageTrail overlay */}
         <div className="absolute inset-0 z-10">
           <ImageTrail
-            items={featuredThemes.map(theme => theme.preview_b64 ? `data:image/png;base64,${theme.preview_b64}` : '/theme-images/1.png')}
+            items={featuredThemes.map(theme => apiService.getAssetUrl(theme.thumbnail_url))}
             variant={2}
           />
         </div>
@@ -104,7 +104,7 @@ export default async function HomePage() {
                 author={theme.author_name}
                 authorAvatar={theme.author_name[0]}
                 downloads={theme.download_count || 0}
-                imageUrl={theme.preview_b64 ? `data:image/png;base64,${theme.preview_b64}` : undefined}
+                imageUrl={apiService.getAssetUrl(theme.thumbnail_url)}
               />
             </div>
           ))}
@@ -132,7 +132,7 @@ export default async function HomePage() {
                 author={theme.author_name}
                 authorAvatar={theme.author_name[0]}
                 downloads={theme.download_count || 0}
-                imageUrl={theme.preview_b64 ? `data:image/png;base64,${theme.preview_b64}` : undefined}
+                imageUrl={apiService.getAssetUrl(theme.thumbnail_url)}
               />
             </div>
           ))}
@@ -51,8 +51,8 @@ export default async function ThemePage({ params }: { params: Promise<{ id: numb
               <div className="flex items-start gap-6 mb-6">
                 {/* Theme Icon */}
                 <div className="flex-shrink-0 w-20 h-20 rounded-full overflow-hidden bg-gray-700 flex items-center justify-center">
-                  {themeData.icon_b64 ? (
-                    <Image src={`data:image/png;base64,${themeData.icon_b64}`} alt="Theme Icon" width={80} height={80} className="w-full h-full object-cover" />
+                  {themeData.icon_url ? (
+                    <Image src={apiService.getAssetUrl(themeData.icon_url)} alt="Theme Icon" width={80} height={80} className="w-full h-full object-cover" />
                   ) : (
                     <span className="text-3xl text-white font-bold">🎨</span>
                   )}
@@ -81,7 +81,7 @@ export default async function ThemePage({ params }: { params: Promise<{ id: numb
          
               <div className="relative">
                 <div className="w-full aspect-[16/18] bg-gradient-to-br from-gray-700 to-gray-800 rounded-lg overflow-hidden flex items-center justify-center">
-                  <Image src={`data:image/png;base64,${themeData.preview_b64}`} alt={themeData.name} height={400} width={350} className="object-contain w-full h-full" />
+                  <Image src={apiService.getAssetUrl(themeData.preview_url)} alt={themeData.name} height={400} width={350} className="object-contain w-full h-full" />
                 </div>
                 {/* QR Code overlay - appears on hover */}
                 <div className="absolute inset-0 bg-black/80 backdrop-blur-sm opacity-0 hover:opacity-100 transition-opacity duration-300 flex items-center justify-center z-20">
@@ -226,8 +226,8 @@ export async function generateMetadata(
     };
   }
 
-  const previewImage = themeData.preview_b64
-    ? `data:image/png;base64,${themeData.preview_b64}`
+  const previewImage = themeData.preview_url
+    ? apiService.getAssetUrl(themeData.preview_url)
     : "/switch-theme-logo.svg";
   const title = themeData.name || "Theme Details | Switch Theme";
   const description = themeData.description || "View details, screenshots, and download options for this custom Nintendo 3DS/2DS theme on Switch Theme.";
@@ -38,7 +38,7 @@ export default async function ThemesPage({ searchParams }: ThemesPageProps) {
     author: theme.author_name,
     authorAvatar: theme.author_name[0],
     downloads: theme.download_count || 0,
-    imageUrl: theme.preview_b64 ? `data:image/png;base64,${theme.preview_b64}` : undefined,
+    imageUrl: apiService.getAssetUrl(theme.thumbnail_url),
   }));
 
   // Client-side sort (sort param is not sent to API)
@@ -1,7 +1,8 @@
 "use client";
 import { useRouter, useSearchParams } from "next/navigation";
 import { Filter, Search } from "lucide-react";
-import { useState } from "react";
+import { useEffect, useState } from "react";
+import { apiService, ISuggestion } from "@/lib/api";
 
 interface SearchAndFiltersProps {
   search: string;
@@ -18,6 +19,20 @@ export default function SearchAndFilters({ search, tags, sort, rating, onSortCha
   const [searchInput, setSearchInput] = useState(search);
   const [tagsInput, setTagsInput] = useState(tags);
   const [sortValue, setSortValue] = useState(sort);
+  const [suggestions, setSuggestions] = useState<ISuggestion[]>([]);
+
+  // Autocomplete from the server's prefix index, debounced per keystroke
+  useEffect(() => {
+    const q = searchInput.trim();
+    if (!q) {
+      setSuggestions([]);
+      return;
+    }
+    const timer = setTimeout(() => {
+      apiService.suggest(q).then(setSuggestions).catch(() => setSuggestions([]));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [searchInput]);
 
   // Helper to update search params in the URL
   const updateParam = (key: string, value: string) => {
@@ -74,7 +89,16 @@ export default function SearchAndFilters({ search, tags, sort, rating, onSortCha
               value={searchInput}
               onChange={e => setSearchInput(e.target.value)}
               onKeyDown={handleSearchKeyDown}
+              list="theme-suggestions"
+              autoComplete="off"
             />
+            <datalist id="theme-suggestions">
+              {suggestions.map(suggestion => (
+                <option key={`${suggestion.kind}-${suggestion.theme_id ?? suggestion.value}`} value={suggestion.value}>
+                  {suggestion.kind}
+                </option>
+              ))}
+            </datalist>
             <button
               type="button"
               className="px-4 py-2 bg-emerald-600 hover:bg-emerald-700 text-white rounded-lg transition-colors duration-200 font-medium"
@@ -58,14 +58,36 @@ export interface ITheme {
   short_description: string;
   description: string;
   tags: string[];
-  preview_b64?: string;
-  icon_b64?: string;
+  preview_url: string;
+  icon_url: string;
   bgm_info?: string;
   download_count?: number;
   created_at?: string;
   updated_at?: string;
 }
 
+export interface IThemeSummary {
+  id: string;
+  theme_id: number;
+  name: string;
+  author_name: string;
+  short_description: string;
+  tags: string[];
+  download_count?: number;
+  created_at?: string;
+  updated_at?: string;
+  preview_url: string;
+  thumbnail_url: string;
+  icon_url: string;
+}
+
+export interface ISuggestion {
+  kind: 'theme' | 'tag' | 'author';
+  value: string;
+  theme_id: number | null;
+  downloads: number;
+}
+
 class ApiService {
   private baseUrl: string;
 
@@ -305,7 +327,18 @@ class ApiService {
         queryString += `&${key}=${value}`;
       });
     }
-    return this.request<{ themes: ITheme[]; total: number; page: number; limit: number }>(`/themes${queryString}`);
+    return this.request<{ themes: IThemeSummary[]; total: number; page: number; limit: number }>(`/themes${queryString}`);
+  }
+
+  async suggest(q: string, limit = 8): Promise<ISuggestion[]> {
+    const { suggestions } = await this.request<{ suggestions: ISuggestion[] }>(
+      `/themes/suggest?q=${encodeURIComponent(q)}&limit=${limit}`
+    );
+    return suggestions;
+  }
+
+  getAssetUrl(path: string): string {
+    return `${this.baseUrl}${path}`;
   }
   
     public async fetchJson<T>(endpoint: string): Promise<T> {